@@ -0,0 +1 @@
+"""Benchmarks of the state_automate integration, run from the repository root."""
@@ -0,0 +1,105 @@
+"""
+Bus dispatch overhead of the zha_event traffic of a busy Zigbee network.
+
+Events are fired at a steady rate, most of them from devices no entity
+listens to, and the CPU time spent per event is measured for:
+
+* none: no listener, the cost of firing and pacing the events alone;
+* filtered: the shared dispatcher, rejecting unmatched events in the bus
+  event_filter so that no listener call is scheduled for them;
+* callback: the same dispatcher as a plain callback listener, called for
+  every event;
+* per entity: one coroutine listener per entity, as before, each event
+  scheduling a task per entity.
+
+    python -m benchmarks.bench_bus --entities 50 --rate 500 --seconds 2
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.state_automate.dispatcher import EventDispatcher
+
+from .bench_dispatch import _events
+from .harness import _ieee, async_start_hass
+from .legacy import listen_per_entity
+
+
+async def _async_paced(hass: HomeAssistant, events: list[dict], rate: float) -> tuple[float, float]:
+    """CPU µs per event, and the share of the wall time the process was busy."""
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for index, data in enumerate(events):
+        hass.bus.async_fire("zha_event", data)
+        delay = wall + (index + 1) / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    await hass.async_block_till_done()
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+    return cpu / len(events) * 1e6, cpu / wall
+
+
+async def async_run(
+    entities: int = 50, rate: float = 500, seconds: float = 2, match_ratio: float = 0.01
+) -> dict:
+    """Per variant, CPU µs per event, busy share and events matched."""
+    stream = _events(entities, int(rate * seconds), match_ratio)
+    hass = await async_start_hass()
+    results = {}
+    try:
+        for name in ("none", "filtered", "callback", "per entity"):
+            received = []
+            if name == "none":
+                unsubs = []
+            elif name == "per entity":
+                unsubs = [
+                    listen_per_entity(
+                        hass, "zha_event", {"device_ieee": _ieee(i)}, received.append
+                    )
+                    for i in range(entities)
+                ]
+            else:
+                dispatcher = EventDispatcher(hass)
+                unsubs = [
+                    dispatcher.async_register(
+                        "zha_event", {"device_ieee": _ieee(i)}, received.append
+                    )
+                    for i in range(entities)
+                ]
+                if name == "callback":
+                    # Same routing, without the bus event_filter
+                    route = dispatcher._routes["zha_event"]
+                    route._unsub()
+                    route._unsub = hass.bus.async_listen("zha_event", route._async_handle_event)
+            results[name] = (*await _async_paced(hass, stream, rate), len(received))
+            for unsub in unsubs:
+                unsub()
+    finally:
+        await hass.async_stop(force=True)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--entities", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=500, help="events per second")
+    parser.add_argument("--seconds", type=float, default=2)
+    parser.add_argument("--match-ratio", type=float, default=0.01)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    results = asyncio.run(async_run(args.entities, args.rate, args.seconds, args.match_ratio))
+    base = results["none"][0]
+    print(f"{'listener':<12} {'CPU µs/event':>13} {'dispatch µs':>12} {'busy':>7} {'matched':>8}")
+    for name, (cpu, busy, matched) in results.items():
+        print(f"{name:<12} {cpu:>13.1f} {cpu - base:>12.1f} {busy:>6.1%} {matched:>8}")
+
+
+if __name__ == "__main__":
+    main()
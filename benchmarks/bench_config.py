@@ -0,0 +1,89 @@
+"""
+Startup cost of a large YAML configuration.
+
+A configuration of remotes × activities is written as YAML and loaded back
+with the Home Assistant loader, then validated, normalized as the import
+flows get it, both in one pass and through the old JSON round trip and deep
+copies, and finally set up as select entities.
+
+    python -m benchmarks.bench_config --remotes 50 --activities 20
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable
+
+import yaml
+
+from custom_components.state_automate import CONFIG_SCHEMA, _normalize
+from custom_components.state_automate.const import DOMAIN
+
+from .harness import async_setup_entities, async_start_hass, load_config, synthetic_config
+from .legacy import process_config
+
+
+def _measure(function: Callable[[], Any], repeat: int = 3) -> tuple[float, float]:
+    """Best time in ms, and peak memory in KiB allocated by one run."""
+    best = min(_elapsed(function) for _ in range(repeat))
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / 1024
+
+
+def _elapsed(function: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+async def async_run(remotes: int = 50, activities: int = 20) -> dict:
+    """Times in ms and peak memory in KiB of each startup step."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        path = os.path.join(config_dir, "state_automate.yaml")
+        with open(path, "w", encoding="utf-8") as file:
+            yaml.safe_dump(synthetic_config(remotes, activities), file)
+        results = {}
+        start = time.perf_counter()
+        config = load_config(path)
+        results["load_ms"] = (time.perf_counter() - start) * 1000
+
+    results["schema_ms"], results["schema_kb"] = _measure(lambda: CONFIG_SCHEMA(config))
+    validated = CONFIG_SCHEMA(config)[DOMAIN]
+    results["normalize_ms"], results["normalize_kb"] = _measure(lambda: _normalize(validated))
+    results["old_normalize_ms"], results["old_normalize_kb"] = _measure(
+        lambda: process_config(validated)
+    )
+    assert _normalize(validated) == process_config(validated)
+
+    hass = await async_start_hass()
+    try:
+        start = time.perf_counter()
+        await async_setup_entities(hass, _normalize(validated), stats=False)
+        results["entities_ms"] = (time.perf_counter() - start) * 1000
+    finally:
+        await hass.async_stop(force=True)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--remotes", type=int, default=50)
+    parser.add_argument("--activities", type=int, default=20)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    results = asyncio.run(async_run(args.remotes, args.activities))
+    for key, value in results.items():
+        print(f"{key:>18}: {value:.1f}")
+
+
+if __name__ == "__main__":
+    main()
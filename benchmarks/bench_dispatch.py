@@ -0,0 +1,107 @@
+"""
+Cost of an event as the number of registered entities grows.
+
+Each entity listens to zha_event for its own remote. The shared dispatcher
+indexes the filters and routes an event to the few entities that can match
+it, against one bus listener per entity each checking its filter.
+
+    python -m benchmarks.bench_dispatch --events 5000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.state_automate.dispatcher import EventDispatcher
+
+from .harness import PAYLOADS, _ieee, async_start_hass
+from .legacy import listen_per_entity
+
+ENTITY_COUNTS = (1, 10, 50, 100, 250, 500)
+
+
+def _events(entities: int, count: int, match_ratio: float) -> list[dict]:
+    """Events of the registered remotes for match_ratio of them, of others else."""
+    events = []
+    every = round(1 / match_ratio) if match_ratio else 0
+    for index in range(count):
+        data = dict(PAYLOADS["zha_event"])
+        if every and index % every == 0:
+            data["device_ieee"] = _ieee(index % entities)
+        else:
+            data["device_ieee"] = f"ff:{_ieee(index % 500)}"
+        events.append(data)
+    return events
+
+
+async def _async_time_events(hass: HomeAssistant, events: list[dict]) -> float:
+    """Microseconds per event, until all listeners ran."""
+    start = time.perf_counter()
+    for index, data in enumerate(events):
+        hass.bus.async_fire("zha_event", data)
+        if index % 256 == 255:
+            await asyncio.sleep(0)
+    await hass.async_block_till_done()
+    return (time.perf_counter() - start) / len(events) * 1e6
+
+
+async def async_run(
+    entity_counts: tuple = ENTITY_COUNTS, events: int = 5000, match_ratio: float = 0.05
+) -> list[tuple[int, float, float, int, int]]:
+    """Rows of (entities, µs/event shared, µs/event per entity, and the events each matched)."""
+    hass = await async_start_hass()
+    rows = []
+    try:
+        for entities in entity_counts:
+            stream = _events(entities, events, match_ratio)
+            received = [0, 0]
+
+            def _shared(_event) -> None:
+                received[0] += 1
+
+            def _per_entity(_event) -> None:
+                received[1] += 1
+
+            dispatcher = EventDispatcher(hass)
+            unsubs = [
+                dispatcher.async_register("zha_event", {"device_ieee": _ieee(i)}, _shared)
+                for i in range(entities)
+            ]
+            shared = await _async_time_events(hass, stream)
+            for unsub in unsubs:
+                unsub()
+
+            unsubs = [
+                listen_per_entity(hass, "zha_event", {"device_ieee": _ieee(i)}, _per_entity)
+                for i in range(entities)
+            ]
+            per_entity = await _async_time_events(hass, stream)
+            for unsub in unsubs:
+                unsub()
+
+            rows.append((entities, shared, per_entity, received[0], received[1]))
+    finally:
+        await hass.async_stop(force=True)
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--match-ratio", type=float, default=0.05)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    rows = asyncio.run(async_run(events=args.events, match_ratio=args.match_ratio))
+    print(f"{'entities':>8} {'shared µs/event':>16} {'per entity µs/event':>20}")
+    for entities, shared, per_entity, matched, matched_legacy in rows:
+        assert matched == matched_legacy
+        print(f"{entities:>8} {shared:>16.2f} {per_entity:>20.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Event data filter checks, on ZHA and deCONZ payloads.
+
+Compares the filter compiled once by `compile_event_filter` with the old
+check parsing the filter on every event, and with
+`check_dict_is_contained_in_another`, which compiles the filter per call.
+
+    python -m benchmarks.bench_filters --number 100000
+"""
+from __future__ import annotations
+
+import argparse
+import timeit
+
+from custom_components.state_automate.common import (
+    check_dict_is_contained_in_another,
+    compile_event_filter,
+)
+
+from .legacy import check_dict_is_contained_in_another as legacy_check
+
+ZHA_EVENT = {
+    "device_ieee": "00:15:8d:00:02:5a:3b:1c",
+    "unique_id": "00:15:8d:00:02:5a:3b:1c:1:0x0006",
+    "device_id": "6ab2f4c1d9e8b7a6c5d4e3f2a1b0c9d8",
+    "endpoint_id": 1,
+    "cluster_id": 6,
+    "command": "toggle",
+    "args": [],
+    "params": {"step_mode": "up", "step_size": "43"},
+}
+DECONZ_EVENT = {
+    "id": "tradfri_remote_control",
+    "unique_id": "00:0b:57:ff:fe:1c:8d:4f-01-1000",
+    "event": 1002,
+    "device_id": "0f8c2e7d6b5a4c3d2e1f0a9b8c7d6e5f",
+}
+
+# name -> (filter, event data)
+CASES = {
+    "zha ieee, match": ({"device_ieee": "00:15:8d:00:02:5a:3b:1c"}, ZHA_EVENT),
+    "zha ieee, other remote": ({"device_ieee": "00:15:8d:00:02:00:00:01"}, ZHA_EVENT),
+    "zha alternatives": (
+        {"device_ieee": "00:15:8d:00:02:5a:3b:1c", "command": "on | off | toggle"},
+        ZHA_EVENT,
+    ),
+    "zha nested": (
+        {"device_ieee": "00:15:8d:00:02:5a:3b:1c", "params.step_mode": "down | up"},
+        ZHA_EVENT,
+    ),
+    "deconz id, match": ({"id": "tradfri_remote_control"}, DECONZ_EVENT),
+    "deconz unique_id, other": ({"unique_id": "00:0b:57:ff:fe:00:00:01-01-1000"}, DECONZ_EVENT),
+}
+
+
+def run(number: int = 100000) -> list[tuple[str, float, float, float]]:
+    """Rows of (case, old, per call compiled, compiled once) in ns per check."""
+    rows = []
+    for name, (filter_data, data) in CASES.items():
+        predicate = compile_event_filter(filter_data)
+        assert predicate(data) == legacy_check(filter_data, data)
+        timings = [
+            min(timeit.repeat(check, number=number, repeat=3)) / number * 1e9
+            for check in (
+                lambda: legacy_check(filter_data, data),
+                lambda: check_dict_is_contained_in_another(filter_data, data),
+                lambda: predicate(data),
+            )
+        ]
+        rows.append((name, *timings))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--number", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'case':<24} {'old ns':>8} {'wrapper ns':>11} {'compiled ns':>12} {'speedup':>8}")
+    for name, old, wrapper, compiled in run(args.number):
+        print(f"{name:<24} {old:>8.0f} {wrapper:>11.0f} {compiled:>12.0f} {old / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
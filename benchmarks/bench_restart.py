@@ -0,0 +1,116 @@
+"""
+Time from the integration setup to the first handled remote press, on restart.
+
+A first start selects an activity on every remote, then Home Assistant is
+restarted from the same configuration directory: the activities are restored
+and a remote is pressed as soon as its entity is added. Measured, from the
+start of the setup:
+
+* first press: until the service call of the pressed state ran;
+* ready: until every entity has built the scripts of all its activities.
+
+Restarts are timed with the snapshot of the validated configuration the
+first start stored, and without it, the configuration going through the
+schema again.
+
+    python -m benchmarks.bench_restart --remotes 100 --activities 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from homeassistant.core import Event, HomeAssistant, ServiceCall, callback
+from homeassistant.setup import async_setup_component
+
+from custom_components.state_automate.const import DOMAIN, STORAGE_KEY_CONFIG
+
+from .harness import KIND_STATE, async_start_hass, synthetic_config
+
+ACTIVITY = "Activity 0"
+
+
+def _all_ready(hass: HomeAssistant, remotes: int) -> bool:
+    states = [hass.states.get(f"select.remote_{index}") for index in range(remotes)]
+    return all(state is not None and state.attributes.get("ready") for state in states)
+
+
+async def _async_start(hass: HomeAssistant, config: dict, remotes: int) -> tuple[float, float]:
+    """Milliseconds from the setup to the first handled press, and to ready."""
+    pressed = f"select.remote_{remotes - 1}"
+    handled = asyncio.get_running_loop().create_future()
+    ready = asyncio.get_running_loop().create_future()
+
+    async def _async_toggle(call: ServiceCall) -> None:
+        if call.data.get("entity_id") == [f"switch.remote_{remotes - 1}_0"] and not handled.done():
+            handled.set_result(time.perf_counter())
+
+    hass.services.async_register("switch", "toggle", _async_toggle)
+
+    @callback
+    def _async_state_changed(event: Event) -> None:
+        new_state = event.data["new_state"]
+        if new_state is None or not new_state.entity_id.startswith("select.remote_"):
+            return
+        if new_state.entity_id == pressed and new_state.state == ACTIVITY and not handled.done():
+            hass.states.async_set(f"sensor.remote_{remotes - 1}", "on")
+        if not ready.done() and _all_ready(hass, remotes):
+            ready.set_result(time.perf_counter())
+
+    unsub = hass.bus.async_listen("state_changed", _async_state_changed)
+    start = time.perf_counter()
+    assert await async_setup_component(hass, DOMAIN, config)
+    first_press, all_ready = await asyncio.gather(handled, ready)
+    unsub()
+    return (first_press - start) * 1000, (all_ready - start) * 1000
+
+
+async def async_run(remotes: int = 100, activities: int = 10) -> dict:
+    """Milliseconds to the first press and to ready, per restart variant."""
+    config = synthetic_config(remotes, activities, KIND_STATE)
+    snapshot = os.path.join(".storage", STORAGE_KEY_CONFIG)
+    results = {}
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_start_hass(config_dir)
+        assert await async_setup_component(hass, DOMAIN, config)
+        await hass.async_block_till_done()
+        for index in range(remotes):
+            await hass.services.async_call(
+                "select",
+                "select_option",
+                {"entity_id": f"select.remote_{index}", "option": ACTIVITY},
+                blocking=True,
+            )
+        await hass.async_block_till_done()
+        await hass.async_stop()
+
+        for name in ("with snapshot", "without snapshot"):
+            if name == "without snapshot" and os.path.exists(os.path.join(config_dir, snapshot)):
+                os.remove(os.path.join(config_dir, snapshot))
+            hass = await async_start_hass(config_dir)
+            try:
+                results[name] = await _async_start(hass, config, remotes)
+            finally:
+                await hass.async_stop(force=True)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--remotes", type=int, default=100)
+    parser.add_argument("--activities", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    results = asyncio.run(async_run(args.remotes, args.activities))
+    print(f"{'restart':<18} {'first press ms':>15} {'ready ms':>9}")
+    for name, (first_press, ready) in results.items():
+        print(f"{name:<18} {first_press:>15.1f} {ready:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Startup and reload of many YAML sources, through the config entries.
+
+The integration is set up from a configuration.yaml of remotes, as Home
+Assistant does: a first start creating the config entries, a restart
+setting up the stored ones, then reloads without and with changes. A
+reload reads and validates the whole YAML configuration again, which
+takes most of its time.
+
+    python -m benchmarks.bench_startup --remotes 100
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+import yaml
+
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+
+from custom_components.state_automate.const import CONF_ACTIVITIES, DOMAIN
+
+from .harness import KIND_STATE, async_start_hass, synthetic_config
+
+
+def _write_config(config_dir: str, config: dict) -> None:
+    with open(os.path.join(config_dir, "configuration.yaml"), "w", encoding="utf-8") as file:
+        yaml.safe_dump(config, file)
+
+
+async def _async_timed(hass: HomeAssistant, coro) -> float:
+    """Milliseconds until everything settled."""
+    start = time.perf_counter()
+    await coro
+    await hass.async_block_till_done()
+    return (time.perf_counter() - start) * 1000
+
+
+async def async_run(remotes: int = 100, activities: int = 10) -> dict:
+    """Milliseconds of each step, and the entries and entities created."""
+    config = synthetic_config(remotes, activities, KIND_STATE)
+    results = {}
+    with tempfile.TemporaryDirectory() as config_dir:
+        _write_config(config_dir, config)
+
+        hass = await async_start_hass(config_dir)
+        results["first_start"] = await _async_timed(
+            hass, async_setup_component(hass, DOMAIN, config)
+        )
+        results["entries"] = len(hass.config_entries.async_entries(DOMAIN))
+        results["entities"] = len(hass.states.async_entity_ids("select"))
+        await hass.async_stop()
+
+        hass = await async_start_hass(config_dir)
+        try:
+            results["restart"] = await _async_timed(
+                hass, async_setup_component(hass, DOMAIN, config)
+            )
+            results["reload_unchanged"] = await _async_timed(
+                hass, hass.services.async_call(DOMAIN, "reload", blocking=True)
+            )
+            for item in config[DOMAIN]:
+                item[CONF_ACTIVITIES][0]["states"]["on"][0]["service"] = "switch.turn_on"
+            _write_config(config_dir, config)
+            results["reload_changed"] = await _async_timed(
+                hass, hass.services.async_call(DOMAIN, "reload", blocking=True)
+            )
+        finally:
+            await hass.async_stop(force=True)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--remotes", type=int, default=100)
+    parser.add_argument("--activities", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    results = asyncio.run(async_run(args.remotes, args.activities))
+    for key, value in results.items():
+        if isinstance(value, float):
+            print(f"{key:>17}: {value:8.1f} ms")
+        else:
+            print(f"{key:>17}: {value}")
+
+
+if __name__ == "__main__":
+    main()
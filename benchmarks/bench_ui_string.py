@@ -0,0 +1,68 @@
+"""
+Parsing of the UI dict strings of the config and options flows.
+
+Times the single pass parser against the old one, rewriting the string
+once per nesting level, on filters growing in width and depth.
+
+    python -m benchmarks.bench_ui_string
+"""
+from __future__ import annotations
+
+import argparse
+import timeit
+
+from custom_components.state_automate.common import (
+    make_string_ui_from_dict,
+    parse_dict_from_ui_string,
+)
+
+from .legacy import parse_dict_from_ui_string as legacy_parse
+
+# (keys per level, nesting depth)
+SHAPES = ((4, 1), (10, 2), (6, 4), (30, 2), (3, 8))
+
+
+def nested_filter(width: int, depth: int) -> dict:
+    """A filter with width keys per level, nested depth levels down."""
+    if depth == 0:
+        return {f"key_{i}": f"value_{i}" for i in range(width)}
+    data = {f"key_{i}": f"value_{i}" for i in range(width - 1)}
+    data["nested"] = nested_filter(width, depth - 1)
+    return data
+
+
+def _fan_out(width: int, depth: int) -> dict:
+    """A filter where every key of a level holds a nested level."""
+    if depth == 0:
+        return {f"key_{i}": f"value_{i}" for i in range(width)}
+    return {f"key_{i}": _fan_out(width, depth - 1) for i in range(width)}
+
+
+def run(number: int = 200) -> list[tuple[str, int, float, float]]:
+    """Rows of (shape, string length, old µs, single pass µs) per parse."""
+    rows = []
+    cases = [(f"{w} keys x {d} levels", nested_filter(w, d)) for w, d in SHAPES]
+    cases.append(("fan out 4 x 4", _fan_out(4, 4)))
+    for name, data in cases:
+        text = make_string_ui_from_dict(data)
+        assert parse_dict_from_ui_string(text) == data
+        timings = [
+            min(timeit.repeat(lambda: parse(text), number=number, repeat=3)) / number * 1e6
+            for parse in (legacy_parse, parse_dict_from_ui_string)
+        ]
+        rows.append((name, len(text), *timings))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'filter':<22} {'chars':>6} {'old µs':>9} {'single pass µs':>15} {'speedup':>8}")
+    for name, length, old, new in run(args.number):
+        print(f"{name:<22} {length:>6} {old:>9.1f} {new:>15.1f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""
+Offline replay and throughput benchmark of the state_automate entities.
+
+The select entities run against an in-process Home Assistant core (bus,
+state machine, services, scripts), no live instance or device needed. The
+configuration is validated by CONFIG_SCHEMA, either loaded from a YAML file
+holding a `state_automate:` block or generated, then a synthetic stream of
+zha_event, deconz_event or state changes is replayed at a given rate.
+
+    python -m benchmarks.harness --remotes 50 --activities 20 --kind zha
+    python -m benchmarks.harness --config remotes.yaml --events 50000 --rate 2000
+
+Reported: startup and reload time, memory per entity, events per second and
+the latency from an event to the first service call of its script.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import random
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Iterator
+
+from homeassistant import bootstrap, loader
+from homeassistant.config_entries import ConfigEntries
+from homeassistant.const import CONF_ENTITY_ID, CONF_EVENT_DATA
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.helpers.entity_component import EntityComponent
+from homeassistant.util.yaml import load_yaml
+
+from custom_components.state_automate import CONFIG_SCHEMA, _async_setup_data, _normalize
+from custom_components.state_automate.common import compile_state_map, parse_numbers
+from custom_components.state_automate.const import (
+    CONF_ACTIVITIES,
+    CONF_EVENT_TYPE,
+    CONF_EVENT_VALUE,
+    CONF_STATE_MAP,
+    CONF_STATE_PRESET,
+    CONF_STATES,
+    CONF_STATS,
+    DOMAIN,
+    KEY_ENTER,
+    KEY_LEAVE,
+)
+from custom_components.state_automate.select import StateAutomateSelect
+from custom_components.state_automate.state_table import RANGE_KEY, _pattern_of_key
+from custom_components.state_automate.stats import STAGE_FIRST_CALL, STAGE_MATCHED
+
+_LOGGER = logging.getLogger(__name__)
+
+KIND_ZHA = "zha"
+KIND_DECONZ = "deconz"
+KIND_STATE = "state"
+KINDS = (KIND_ZHA, KIND_DECONZ, KIND_STATE)
+
+# Realistic payloads, the filter and state values are set on top of them
+PAYLOADS = {
+    "zha_event": {
+        "device_ieee": "00:15:8d:00:02:00:00:00",
+        "unique_id": "00:15:8d:00:02:00:00:00:1:0x0006",
+        "device_id": "0" * 32,
+        "endpoint_id": 1,
+        "cluster_id": 6,
+        "command": "toggle",
+        "args": [],
+        "params": {},
+    },
+    "deconz_event": {
+        "id": "remote",
+        "unique_id": "00:15:8d:00:02:00:00:00-01-1000",
+        "event": 1002,
+        "device_id": "0" * 32,
+    },
+}
+SYNTHETIC_KEYS = {
+    KIND_ZHA: ["on", "off", "toggle", "step_up", "step_down", "move", "stop"],
+    KIND_DECONZ: ["1002", "2002", "3002", "4002", "1001", "2001", "1003"],
+    KIND_STATE: ["on", "off", "brightness_up", "brightness_down", "arrow_left_click"],
+}
+
+
+def _ieee(index: int) -> str:
+    raw = f"{index:016x}"
+    return ":".join(raw[i : i + 2] for i in range(0, 16, 2))
+
+
+def synthetic_config(remotes: int, activities: int, kind: str = KIND_ZHA) -> dict:
+    """A `state_automate` configuration of remotes with the same layout."""
+    items = []
+    for remote in range(remotes):
+        if kind == KIND_ZHA:
+            item = {
+                CONF_EVENT_TYPE: "zha_event",
+                CONF_EVENT_VALUE: "command",
+                CONF_EVENT_DATA: {"device_ieee": _ieee(remote)},
+            }
+        elif kind == KIND_DECONZ:
+            item = {
+                CONF_EVENT_TYPE: "deconz_event",
+                CONF_EVENT_VALUE: "event",
+                CONF_EVENT_DATA: {"unique_id": f"{_ieee(remote)}-01-1000"},
+            }
+        else:
+            item = {CONF_ENTITY_ID: f"sensor.remote_{remote}"}
+        item["name"] = f"Remote {remote}"
+        item[CONF_ACTIVITIES] = [
+            {
+                "name": f"Activity {activity}",
+                CONF_STATES: {
+                    key: [
+                        {
+                            "service": "switch.toggle",
+                            "target": {"entity_id": f"switch.remote_{remote}_{index}"},
+                        }
+                    ]
+                    for index, key in enumerate(SYNTHETIC_KEYS[kind])
+                },
+            }
+            for activity in range(activities)
+        ]
+        items.append(item)
+    return {DOMAIN: items}
+
+
+def load_config(path: str) -> dict:
+    """The `state_automate` block of a YAML file, !include and !secret resolved."""
+    config = load_yaml(path)
+    if DOMAIN not in config:
+        config = {DOMAIN: config}
+    return config
+
+
+def validate_config(config: dict) -> list[dict]:
+    """Entity configurations, validated and normalized as on setup."""
+    return _normalize(CONFIG_SCHEMA(config)[DOMAIN])
+
+
+def _plain_keys(activity: dict) -> list[str]:
+    """Keys of the states of an activity a single raw state maps to."""
+    keys = []
+    for name, states in activity.items():
+        if name != CONF_STATES and not name.startswith(f"{CONF_STATES} "):
+            continue
+        for key in states:
+            if key in (KEY_ENTER, KEY_LEAVE) or ":" in key:
+                continue
+            if RANGE_KEY.match(key) or _pattern_of_key(key) is not None:
+                continue
+            keys.append(key)
+    return keys
+
+
+def _set_path(data: dict, path: str, value: Any) -> None:
+    *parents, last = path.split(".")
+    for part in parents:
+        data = data.setdefault(part, {})
+    data[last] = value
+
+
+class _Source:
+    """What triggers one entity: its event filter or entity id, and its keys."""
+
+    def __init__(self, config: dict, activity: str) -> None:
+        self.entity_id = config.get(CONF_ENTITY_ID)
+        self.event_type = config.get(CONF_EVENT_TYPE)
+        self.event_value = config.get(CONF_EVENT_VALUE)
+        self.event_data = {}
+        for key, value in config.get(CONF_EVENT_DATA, {}).items():
+            if isinstance(value, str):
+                value = value.split("|")[0].strip()
+            _set_path(self.event_data, key, value)
+
+        raw_of = {}
+        for raw, key in compile_state_map(
+            config.get(CONF_STATE_PRESET), config.get(CONF_STATE_MAP)
+        ).items():
+            raw_of.setdefault(key, raw)
+        activities = {act["name"]: act for act in config[CONF_ACTIVITIES]}
+        self.raws = [raw_of.get(key, key) for key in _plain_keys(activities[activity])]
+
+    def payload(self, raw: str) -> dict:
+        data = {**PAYLOADS.get(self.event_type, {}), **self.event_data}
+        _set_path(data, self.event_value, parse_numbers(raw))
+        return data
+
+
+def event_stream(
+    configs: list[dict], count: int, match_ratio: float = 0.05, seed: int = 0
+) -> Iterator[tuple[str, str, Any]]:
+    """
+    Yield ("event", event_type, data) and ("state", entity_id, state) triggers.
+
+    A match_ratio share of them trigger a script of an entity, in its first
+    activity; the others come from devices no entity listens to, as most of
+    the traffic of a busy Zigbee network does.
+    """
+    rng = random.Random(seed)
+    sources = [_Source(config, config[CONF_ACTIVITIES][0]["name"]) for config in configs]
+    sources = [source for source in sources if source.raws]
+    event_types = sorted({s.event_type for s in sources if s.event_type}) or ["zha_event"]
+    last_states = {}
+    for index in range(count):
+        if sources and rng.random() < match_ratio:
+            source = rng.choice(sources)
+            raw = rng.choice(source.raws)
+            if source.entity_id is not None:
+                if last_states.get(source.entity_id) == raw:
+                    # Only state changes are routed, as with real remotes
+                    yield "state", source.entity_id, ""
+                last_states[source.entity_id] = raw
+                yield "state", source.entity_id, raw
+            else:
+                yield "event", source.event_type, source.payload(raw)
+            continue
+        if sources and all(s.entity_id is not None for s in sources):
+            yield "state", f"sensor.other_{index % 500}", str(index)
+            continue
+        event_type = rng.choice(event_types)
+        data = dict(PAYLOADS.get(event_type, {}))
+        data["device_ieee"] = data["unique_id"] = data["id"] = f"ff:{_ieee(index % 500)}"
+        yield "event", event_type, data
+
+
+async def async_start_hass(config_dir: str | None = None) -> HomeAssistant:
+    """A started Home Assistant core with its registries loaded."""
+    hass = HomeAssistant(config_dir or tempfile.mkdtemp())
+    hass.config.skip_pip = True
+    hass.config_entries = ConfigEntries(hass, {})
+    loader.async_setup(hass)
+    await bootstrap.async_load_base_functionality(hass)
+    await hass.async_start()
+    return hass
+
+
+def _register_services(hass: HomeAssistant, configs: list[dict]) -> None:
+    """Register a no-op for every service the scripts call and nobody serves."""
+
+    async def _async_noop(_call: ServiceCall) -> None:
+        return
+
+    def _walk(node: Any) -> Iterator[str]:
+        if isinstance(node, dict):
+            service = node.get("service")
+            if isinstance(service, str) and "." in service and "{" not in service:
+                yield service
+            for value in node.values():
+                yield from _walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                yield from _walk(value)
+
+    for service in set(_walk(configs)):
+        domain, name = service.split(".", 1)
+        if not hass.services.has_service(domain, name):
+            hass.services.async_register(domain, name, _async_noop)
+
+
+async def async_setup_entities(
+    hass: HomeAssistant, configs: list[dict], stats: bool = True
+) -> list[StateAutomateSelect]:
+    """Add a select entity per configuration, once their scripts are built."""
+    if DOMAIN not in hass.data:
+        _async_setup_data(hass)
+    _register_services(hass, configs)
+    component = EntityComponent(_LOGGER, "select", hass)
+    entities = [
+        StateAutomateSelect(
+            hass, {**config, CONF_STATS: stats}, config[CONF_ACTIVITIES][0]["name"]
+        )
+        for config in configs
+    ]
+    await component.async_add_entities(entities)
+    await hass.async_block_till_done()
+    return entities
+
+
+async def async_replay(
+    hass: HomeAssistant, triggers: list[tuple[str, str, Any]], rate: float = 0
+) -> float:
+    """
+    Fire the triggers, rate of them per second or as fast as possible.
+
+    Return the seconds until the last of them was handled.
+    """
+    start = time.perf_counter()
+    for index, (kind, name, data) in enumerate(triggers):
+        if kind == "state":
+            hass.states.async_set(name, data)
+        else:
+            hass.bus.async_fire(name, data)
+        if rate:
+            delay = start + (index + 1) / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        elif index % 256 == 255:
+            # Let the listeners and scripts run, as a real event source would
+            await asyncio.sleep(0)
+    await hass.async_block_till_done()
+    return time.perf_counter() - start
+
+
+def _latency_ms(entities: list[StateAutomateSelect], stage: str) -> dict:
+    samples = sorted(
+        value * 1000 for entity in entities for value in entity._stats.samples[stage]
+    )
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "p50": round(samples[len(samples) // 2], 3),
+        "p95": round(samples[int(len(samples) * 0.95)], 3),
+        "max": round(samples[-1], 3),
+    }
+
+
+def _changed(configs: list[dict]) -> list[dict]:
+    """The configurations with the first activity of each changed."""
+    changed = []
+    for config in configs:
+        activities = [dict(act) for act in config[CONF_ACTIVITIES]]
+        activities[0]["reloaded"] = True
+        changed.append({**config, CONF_ACTIVITIES: activities})
+    return changed
+
+
+async def async_measure_memory(configs: list[dict]) -> float:
+    """Bytes allocated per entity once set up and warmed up."""
+    hass = await async_start_hass()
+    try:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        entities = await async_setup_entities(hass, configs, stats=False)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+        return allocated / len(entities)
+    finally:
+        await hass.async_stop(force=True)
+
+
+async def async_run(
+    config: dict,
+    events: int = 10000,
+    rate: float = 0,
+    match_ratio: float = 0.05,
+    memory: bool = True,
+) -> dict:
+    """Run the whole benchmark on a configuration, return the measures."""
+    results = {}
+    start = time.perf_counter()
+    configs = validate_config(config)
+    results["entities"] = len(configs)
+    results["activities"] = sum(len(c[CONF_ACTIVITIES]) for c in configs)
+    results["validate_ms"] = (time.perf_counter() - start) * 1000
+
+    if memory:
+        results["memory_per_entity_kb"] = await async_measure_memory(configs) / 1024
+
+    hass = await async_start_hass()
+    try:
+        start = time.perf_counter()
+        entities = await async_setup_entities(hass, configs)
+        results["startup_ms"] = (time.perf_counter() - start) * 1000
+
+        changed = _changed(configs)
+        start = time.perf_counter()
+        for entity, changed_config in zip(entities, changed):
+            entity.async_update_activities(changed_config[CONF_ACTIVITIES])
+        await hass.async_block_till_done()
+        results["reload_ms"] = (time.perf_counter() - start) * 1000
+
+        triggers = list(event_stream(configs, events, match_ratio))
+        elapsed = await async_replay(hass, triggers, rate)
+        results["events"] = len(triggers)
+        results["events_per_s"] = len(triggers) / elapsed
+        results["matched_ms"] = _latency_ms(entities, STAGE_MATCHED)
+        results["first_call_ms"] = _latency_ms(entities, STAGE_FIRST_CALL)
+    finally:
+        await hass.async_stop(force=True)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--config", help="YAML file holding a state_automate block")
+    parser.add_argument("--remotes", type=int, default=50)
+    parser.add_argument("--activities", type=int, default=20)
+    parser.add_argument("--kind", choices=KINDS, default=KIND_ZHA)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--rate", type=float, default=0, help="events per second, 0 for unthrottled")
+    parser.add_argument("--match-ratio", type=float, default=0.05)
+    parser.add_argument("--no-memory", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    if args.config:
+        config = load_config(args.config)
+    else:
+        config = synthetic_config(args.remotes, args.activities, args.kind)
+    results = asyncio.run(
+        async_run(config, args.events, args.rate, args.match_ratio, not args.no_memory)
+    )
+    for key, value in results.items():
+        print(f"{key:>22}: {round(value, 2) if isinstance(value, float) else value}")
+
+
+if __name__ == "__main__":
+    main()
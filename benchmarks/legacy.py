@@ -0,0 +1,120 @@
+"""
+The hot paths as they were before being optimized, to compare against.
+
+Copied from the first release of the integration, only trimmed of what the
+benchmarks do not run.
+"""
+from __future__ import annotations
+
+import copy
+import json
+import re
+from typing import Any, Callable
+
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant
+
+_rg_dict_extraction = re.compile(r"({[^{}]+})")
+
+
+def check_dict_is_contained_in_another(filter_data: dict, data: dict) -> bool:
+    """Filter check parsing the filter on every event."""
+    for key, value in filter_data.items():
+        if key in data:
+            lst_val = [value]
+            if "|" in value:
+                lst_val = [v.strip() for v in value.split("|")]
+            if data[key] not in lst_val:
+                return False
+            continue
+
+        if "." in key:
+            base_key, sub_key = key.split(".", maxsplit=1)
+            if base_key not in data:
+                return False
+
+            base_value = data[base_key]
+            if not isinstance(base_value, dict):
+                return False
+
+            if not check_dict_is_contained_in_another({sub_key: value}, base_value):
+                return False
+
+            continue
+
+        return False
+
+    return True
+
+
+def listen_per_entity(
+    hass: HomeAssistant, event_type: str, event_data: dict, target: Callable[[Event], Any]
+) -> CALLBACK_TYPE:
+    """A bus listener of its own for one entity, its filter checked in a task."""
+
+    async def _event_publisher(event: Event):
+        if check_dict_is_contained_in_another(event_data, event.data):
+            target(event)
+
+    return hass.bus.async_listen(event_type, _event_publisher)
+
+
+def process_config(config_yaml: list) -> list:
+    """YAML entries as given to the import flows, through JSON and deep copies."""
+    return [copy.deepcopy(it) for it in json.loads(json.dumps(config_yaml))]
+
+
+def _from_str_to_dict(raw_data: str) -> dict:
+    """Assume format `key1: value1, key2: value2, ...`."""
+    raw_pairs = raw_data.split(",")
+
+    def _parse_item(raw_key: str):
+        return raw_key.lstrip(" ").rstrip(" ").rstrip(":")
+
+    data_out = {}
+    for pair in raw_pairs:
+        if ":" not in pair:
+            break
+        key, value = pair.split(":", maxsplit=1)
+        data_out[_parse_item(key)] = _parse_item(value)
+
+    return data_out
+
+
+def _walk_nested_dict(container: dict, substitutions: dict):
+    for key, value in container.items():
+        if isinstance(value, dict):
+            _walk_nested_dict(value, substitutions)
+        elif value in substitutions:
+            new_value = substitutions[value]
+            if isinstance(new_value, dict):
+                _walk_nested_dict(new_value, substitutions)
+
+            # Making substitution
+            container[key] = new_value
+
+
+def parse_dict_from_ui_string(str_use) -> dict:
+    """UI string parser rewriting the string once per nesting level."""
+    substitutions = {}
+    counter_subs = 0
+    str_subs = str_use
+    count_nesting = 0
+    while "{" in str_subs and count_nesting < 10:
+        count_nesting += 1
+        for found in _rg_dict_extraction.findall(str_subs):
+            parsed_piece = _from_str_to_dict(found[1:-1])
+
+            key_sub = f"SUB{counter_subs:03d}"
+            substitutions[key_sub] = parsed_piece
+            counter_subs += 1
+
+            str_subs = str_subs.replace(found, key_sub, 1)
+
+    # last parse for final root keys
+    data = _from_str_to_dict(str_subs)
+
+    # Now to substitute values:
+    if substitutions:
+        _walk_nested_dict(data, substitutions)
+
+    return data
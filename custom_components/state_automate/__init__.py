@@ -1,28 +1,27 @@
 import asyncio
-from collections import OrderedDict
-import copy
-import json
+from collections import Counter
+from datetime import date, time, timedelta
 import logging
 from typing import Any
 from typing_extensions import Required
 
 import voluptuous as vol  # pylint: disable=import-error
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntry
 from homeassistant.const import (  # pylint: disable=import-error
     CONF_ENTITY_ID,
     CONF_EVENT_DATA,
     CONF_NAME,
+    CONF_PATH,
     SERVICE_RELOAD,
 )
 from homeassistant.helpers import entity_registry as er
 
 import homeassistant.helpers.config_validation as cv  # pylint: disable=import-error
+from homeassistant.helpers.script_variables import ScriptVariables
+from homeassistant.helpers.template import Template
 from homeassistant.helpers.reload import setup_reload_service
-from homeassistant.helpers.dispatcher import (  # pylint: disable=import-error
-    async_dispatcher_send,
-)
 from homeassistant.helpers.entity_component import EntityComponent
 from homeassistant.helpers.service import (
     ReloadServiceHelper,
@@ -31,36 +30,128 @@ from homeassistant.helpers.service import (
 
 from .const import (
     CONF_ACTIVITIES,
+    CONF_COALESCE,
+    CONF_COMMAND_GAP,
+    CONF_DEVICES,
+    CONF_DIFF_TRANSITIONS,
     CONF_EVENT_TYPE,
     CONF_EVENT_VALUE,
+    CONF_GESTURE_WINDOW,
+    CONF_HOLD_TIME,
+    CONF_MERGE_CALLS,
+    CONF_QUEUE_MODE,
+    CONF_QUEUE_SIZE,
+    CONF_RATE_LIMIT,
+    CONF_SKIP_SATISFIED,
+    CONF_STATE_MAP,
+    CONF_STATE_PRESET,
     CONF_STATES,
+    CONF_STATS,
+    CONF_SUPERSEDE,
+    CONF_TRANSITION,
+    CONF_TRANSPORTS,
+    DATA_CALL_TRACKER,
+    DATA_CAPTURE,
+    DATA_DISPATCHER,
+    DATA_STATE_ROUTER,
+    DATA_TIMER_WHEEL,
+    DATA_ENTITIES,
+    DATA_SCHEDULER,
+    DATA_SCRIPT_CACHE,
+    DEFAULT_GESTURE_WINDOW,
+    DEFAULT_HOLD_TIME,
+    DEFAULT_QUEUE_SIZE,
     DOMAIN,
+    EVENT_STATS,
+    KEY_ENTER,
+    KEY_LEAVE,
     PLATFORMS,
+    QUEUE_MODE_QUEUED,
+    QUEUE_MODE_RESTART,
+    SERVICE_CAPTURE_EXPORT,
+    SERVICE_CAPTURE_START,
+    SERVICE_CAPTURE_STOP,
+    SERVICE_GET_STATS,
     SIGNAL_STATE_UPDATED,
+    TRANSITION_PARALLEL,
+    TRANSITION_SEQUENTIAL,
 )
+from .capture import TrafficCapture
+from .common import STATE_MAP_PRESETS, config_hash
+from .config_flow import entry_unique_id
+from .dispatcher import EventDispatcher, StateRouter
+from .gestures import TimerWheel
+from .scheduler import CommandScheduler
+from .script_cache import ScriptCache
+from .stats import ServiceCallTracker
 
 _LOGGER = logging.getLogger(__name__)
 
-UPDATE_UNLISTENER = None
+
+def _normalize_key(key: Any) -> str:
+    if isinstance(key, str):
+        return key if type(key) is str else str(key)
+    if isinstance(key, bool):
+        return "true" if key else "false"
+    if key is None:
+        return "null"
+    return str(key)
+
+
+def _normalize(value: Any) -> Any:
+    """
+    Convert a configuration tree to plain JSON types in a single pass.
+
+    Only the nodes that need it are rebuilt (dict and str subclasses from the
+    YAML loader, non-string keys, templates, script variables, times); the
+    other subtrees are shared with the input. Values of any other type raise
+    a TypeError.
+    """
+    if value is None or type(value) in (str, int, float, bool):
+        return value
+    if isinstance(value, dict):
+        changed = type(value) is not dict
+        items = []
+        for key, item in value.items():
+            new_key = _normalize_key(key)
+            new_item = _normalize(item)
+            changed = changed or new_key is not key or new_item is not item
+            items.append((new_key, new_item))
+        return dict(items) if changed else value
+    if isinstance(value, (list, tuple)):
+        items = [_normalize(item) for item in value]
+        if type(value) is list and all(a is b for a, b in zip(items, value)):
+            return value
+        return items
+    # Subclasses of the plain types, as the YAML loader strings and enums
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    if isinstance(value, Template):
+        return value.template
+    if isinstance(value, ScriptVariables):
+        return _normalize(value.variables)
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    raise TypeError(f"Cannot normalize {type(value).__name__}: {value!r}")
 
 
 def _ensure_dict(value: Any) -> dict:
     if isinstance(value, dict):
         return value
-    if isinstance(value, OrderedDict):
-        ret = json.loads(json.dumps(value))
-        # _LOGGER.debug(f"_ensure_dict: {ret}")
-        return ret
     if isinstance(value, list):
         ret = {}
-        for it in json.loads(json.dumps(value)):
-            for k, v in it.items():
-                ret[k] = v
+        for it in value:
+            ret.update(_normalize(it))
         # _LOGGER.debug(f"_ensure_dict: {ret}")
         return ret
 
-    ret = json.loads(json.dumps(value))
-    raise vol.Invalid(f"Cannot convert to dict: {type(value)} / {ret}")
+    raise vol.Invalid(f"Cannot convert to dict: {type(value)} / {value}")
 
 
 def _script_dict(value: Any) -> Any:
@@ -76,13 +167,44 @@ ACTIVITY_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_NAME): cv.string,
         vol.Match(fr"^{CONF_STATES}(| .+)$"): vol.All(_ensure_dict, _script_dict),
+        vol.Optional(CONF_DEVICES): {
+            vol.Optional(KEY_ENTER): vol.All(cv.ensure_list, [cv.string]),
+            vol.Optional(KEY_LEAVE): vol.All(cv.ensure_list, [cv.string]),
+        },
     }
 )
+ENTITY_OPTIONS = {
+    vol.Optional(CONF_QUEUE_MODE, default=QUEUE_MODE_RESTART): vol.In(
+        [QUEUE_MODE_RESTART, QUEUE_MODE_QUEUED]
+    ),
+    vol.Optional(CONF_QUEUE_SIZE, default=DEFAULT_QUEUE_SIZE): cv.positive_int,
+    vol.Optional(CONF_COALESCE, default=True): cv.boolean,
+    vol.Optional(CONF_RATE_LIMIT, default=0): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    vol.Optional(CONF_TRANSITION, default=TRANSITION_SEQUENTIAL): vol.In(
+        [TRANSITION_SEQUENTIAL, TRANSITION_PARALLEL]
+    ),
+    vol.Optional(CONF_DIFF_TRANSITIONS, default=False): cv.boolean,
+    vol.Optional(CONF_SKIP_SATISFIED, default=False): cv.boolean,
+    vol.Optional(CONF_MERGE_CALLS, default=False): cv.boolean,
+    vol.Optional(CONF_STATS, default=False): cv.boolean,
+    vol.Optional(CONF_STATE_PRESET): vol.In(list(STATE_MAP_PRESETS)),
+    vol.Optional(CONF_STATE_MAP): {cv.string: cv.string},
+    vol.Optional(CONF_COMMAND_GAP): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    vol.Optional(CONF_SUPERSEDE, default=False): cv.boolean,
+    vol.Optional(CONF_TRANSPORTS): {cv.string: cv.entity_ids},
+    vol.Optional(CONF_GESTURE_WINDOW, default=DEFAULT_GESTURE_WINDOW): vol.All(
+        vol.Coerce(float), vol.Range(min=0)
+    ),
+    vol.Optional(CONF_HOLD_TIME, default=DEFAULT_HOLD_TIME): vol.All(
+        vol.Coerce(float), vol.Range(min=0)
+    ),
+}
 ENTITY_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_ENTITY_ID): cv.entity_id,
         vol.Required(CONF_ACTIVITIES): vol.All(cv.ensure_list, [ACTIVITY_SCHEMA]),
         vol.Optional(CONF_NAME): cv.string,
+        **ENTITY_OPTIONS,
     }
 )
 EVENT_SCHEMA = vol.Schema(
@@ -92,6 +214,7 @@ EVENT_SCHEMA = vol.Schema(
         vol.Optional(CONF_NAME): cv.string,
         vol.Optional(CONF_EVENT_DATA): vol.All(_ensure_dict),
         vol.Required(CONF_ACTIVITIES): vol.All(cv.ensure_list, [ACTIVITY_SCHEMA]),
+        **ENTITY_OPTIONS,
     }
 )
 
@@ -103,27 +226,115 @@ CONFIG_SCHEMA = vol.Schema(
 )
 
 
+def _without_activities(config: dict) -> dict:
+    return {k: v for k, v in config.items() if k != CONF_ACTIVITIES}
+
+
+def _async_update_entry_in_place(
+    hass: HomeAssistant, entry: ConfigEntry, config: dict, stats: Counter
+) -> bool:
+    """
+    Apply a reloaded YAML item to its running entry without reloading it.
+
+    Only possible when nothing but the activities changed.
+    Return False when the entry needs a full reload.
+    """
+    activity_count = len(config.get(CONF_ACTIVITIES, []))
+    if config_hash(dict(entry.data)) == config_hash(config):
+        stats["entries_reused"] += 1
+        stats["activities_reused"] += activity_count
+        return True
+
+    entity = hass.data[DATA_ENTITIES].get(entry.entry_id)
+    if entity is None or config_hash(
+        _without_activities(dict(entry.data))
+    ) != config_hash(_without_activities(config)):
+        stats["entries_rebuilt"] += 1
+        stats["activities_rebuilt"] += activity_count
+        return False
+
+    reused, rebuilt = entity.async_update_activities(config[CONF_ACTIVITIES])
+    hass.data[DOMAIN][entry.entry_id] = {**config, **entry.options}
+    hass.config_entries.async_update_entry(entry, data=config)
+    stats["entries_updated"] += 1
+    stats["activities_reused"] += reused
+    stats["activities_rebuilt"] += rebuilt
+    return True
+
+
+async def _async_import_entries(hass: HomeAssistant, items: list[dict]) -> None:
+    """Create the config entries of new YAML items, in a single task."""
+    await asyncio.gather(
+        *(
+            hass.config_entries.flow.async_init(
+                DOMAIN, context={"source": SOURCE_IMPORT}, data=it
+            )
+            for it in items
+        )
+    )
+
+
 async def _async_process_config(
     hass: HomeAssistant,
     config: dict[str, Any],
     component: EntityComponent,
+    reload: bool = False,
 ) -> bool:
-    config_yaml = json.loads(json.dumps(config[DOMAIN]))
+    config_yaml = _normalize(config[DOMAIN])
     _LOGGER.debug(config_yaml)
 
+    # Existing entries are updated directly in one pass, only the new items go
+    # through an import flow. Entries not set up yet just pick up their data.
+    entries = {
+        entry.unique_id: entry for entry in hass.config_entries.async_entries(DOMAIN)
+    }
+    stats = Counter()
+    new_items = []
+
     for it in config_yaml:
-        hass.async_add_job(
-            hass.config_entries.flow.async_init(
-                DOMAIN, context={"source": SOURCE_IMPORT}, data=copy.deepcopy(it)
-            )
+        entry = entries.get(entry_unique_id(it))
+        if entry is None:
+            new_items.append(it)
+            continue
+        if reload and _async_update_entry_in_place(hass, entry, it, stats):
+            continue
+        if config_hash(dict(entry.data)) != config_hash(it):
+            # The update listener reloads the entry when it is set up
+            hass.config_entries.async_update_entry(entry, data=it)
+
+    if new_items:
+        stats["entries_created"] = len(new_items)
+        hass.async_create_task(_async_import_entries(hass, new_items))
+
+    if reload:
+        _LOGGER.info(
+            f"Reloaded {len(config_yaml)} entries: "
+            f"{stats['entries_reused']} reused, {stats['entries_updated']} updated, "
+            f"{stats['entries_rebuilt']} rebuilt, {stats['entries_created']} created; "
+            f"activities: "
+            f"{stats['activities_reused']} reused, {stats['activities_rebuilt']} rebuilt"
         )
 
 
+@callback
+def _async_setup_data(hass: HomeAssistant) -> None:
+    """Create the helpers shared by all the state_automate entities."""
+    hass.data[DOMAIN] = {}
+    hass.data[DATA_CAPTURE] = TrafficCapture(hass)
+    hass.data[DATA_DISPATCHER] = EventDispatcher(hass, hass.data[DATA_CAPTURE])
+    hass.data[DATA_STATE_ROUTER] = StateRouter(hass)
+    hass.data[DATA_ENTITIES] = {}
+    hass.data[DATA_SCRIPT_CACHE] = ScriptCache()
+    hass.data[DATA_CALL_TRACKER] = ServiceCallTracker(hass)
+    hass.data[DATA_SCHEDULER] = CommandScheduler(hass)
+    hass.data[DATA_TIMER_WHEEL] = TimerWheel(hass)
+
+
 async def async_setup(hass: HomeAssistant, config: dict):
     if DOMAIN not in config:
         return True
 
-    hass.data[DOMAIN] = {}
+    _async_setup_data(hass)
 
     component = EntityComponent(_LOGGER, DOMAIN, hass)
     await _async_process_config(hass, config, component)
@@ -132,7 +343,7 @@ async def async_setup(hass: HomeAssistant, config: dict):
         if (conf := await component.async_prepare_reload()) is None:
             _LOGGER.error(f"Cannot trigger reload")
             return
-        await _async_process_config(hass, conf, component)
+        await _async_process_config(hass, conf, component, reload=True)
         hass.bus.async_fire(SIGNAL_STATE_UPDATED, context=service_call.context)
 
     reload_helper = ReloadServiceHelper(reload_service_handler)
@@ -145,23 +356,77 @@ async def async_setup(hass: HomeAssistant, config: dict):
         schema=vol.Schema({}),
     )
 
+    async def get_stats_service_handler(service_call):
+        entity_ids = service_call.data.get(CONF_ENTITY_ID)
+        stats = {
+            entity.entity_id: entity.latency_stats
+            for entity in hass.data[DATA_ENTITIES].values()
+            if entity.latency_stats is not None
+            and (entity_ids is None or entity.entity_id in entity_ids)
+        }
+        _LOGGER.info(f"Latency stats: {stats}")
+        hass.bus.async_fire(EVENT_STATS, stats, context=service_call.context)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_STATS,
+        get_stats_service_handler,
+        schema=vol.Schema({vol.Optional(CONF_ENTITY_ID): cv.entity_ids}),
+    )
+
+    capture = hass.data[DATA_CAPTURE]
+
+    async def _async_capture_path(service_call, default: str) -> str | None:
+        """Path given to a capture service, None when it is not allowed."""
+        if CONF_PATH not in service_call.data:
+            return hass.config.path(default)
+        # Relative paths are under the configuration directory
+        path = hass.config.path(service_call.data[CONF_PATH])
+        if not await hass.async_add_executor_job(hass.config.is_allowed_path, path):
+            _LOGGER.error(f"Cannot write capture to {path}: path is not allowed")
+            return None
+        return path
+
+    async def capture_start_service_handler(service_call):
+        path = await _async_capture_path(service_call, f"{DOMAIN}_capture.bin")
+        if path is not None:
+            await capture.async_start(path)
+
+    async def capture_stop_service_handler(service_call):
+        await capture.async_stop()
+
+    async def capture_export_service_handler(service_call):
+        path = await _async_capture_path(service_call, f"{DOMAIN}_capture.jsonl")
+        if path is not None:
+            await capture.async_export(path)
+
+    for service, handler in (
+        (SERVICE_CAPTURE_START, capture_start_service_handler),
+        (SERVICE_CAPTURE_EXPORT, capture_export_service_handler),
+    ):
+        async_register_admin_service(
+            hass,
+            DOMAIN,
+            service,
+            handler,
+            schema=vol.Schema({vol.Optional(CONF_PATH): cv.string}),
+        )
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        SERVICE_CAPTURE_STOP,
+        capture_stop_service_handler,
+        schema=vol.Schema({}),
+    )
+
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry):
-    global UPDATE_UNLISTENER
-    if UPDATE_UNLISTENER:
-        UPDATE_UNLISTENER()
+    # The event filter and state map set in the options flow apply over the YAML
+    config = {**config_entry.data, **config_entry.options}
 
-    config = {}
-    for key, value in config_entry.data.items():
-        config[key] = value
-    for key, value in config_entry.options.items():
-        config[key] = value
-    if config_entry.options:
-        hass.config_entries.async_update_entry(config_entry, data=config, options={})
-
-    UPDATE_UNLISTENER = config_entry.add_update_listener(_update_listener)
+    config_entry.async_on_unload(config_entry.add_update_listener(_update_listener))
 
     _LOGGER.info(
         "Initializing State Automate platform on %s",
@@ -178,13 +443,17 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry):
             hass.config_entries.async_forward_entry_setup(config_entry, component)
         )
 
-    async_dispatcher_send(hass, SIGNAL_STATE_UPDATED)
-
     return True
 
 
 async def _update_listener(hass: HomeAssistant, config_entry: ConfigEntry):
     """Update listener."""
+    running = hass.data[DOMAIN].get(config_entry.entry_id)
+    if running is not None and config_hash(running) == config_hash(
+        {**config_entry.data, **config_entry.options}
+    ):
+        # Already applied in place by the reload service
+        return
     await hass.config_entries.async_reload(config_entry.entry_id)
 
 
@@ -207,5 +476,6 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry):
 
     if unload_ok:
         hass.data[DOMAIN].pop(config_entry.entry_id)
+        hass.data[DATA_ENTITIES].pop(config_entry.entry_id, None)
 
     return unload_ok
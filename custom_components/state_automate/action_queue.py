@@ -0,0 +1,162 @@
+"""Per-entity queue running the state scripts outside of the event handlers."""
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+import logging
+import time
+from typing import Awaitable, Callable
+
+from homeassistant.core import Context, HomeAssistant, callback
+from homeassistant.helpers.script import Script
+
+from .const import QUEUE_MODE_QUEUED, QUEUE_MODE_RESTART
+from .stats import STAGE_RUN_START, Trace
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ActionQueue:
+    """
+    Run the state scripts of an entity, without the event handlers waiting.
+
+    In `restart` mode (the default), each trigger runs its script right away,
+    concurrently with the scripts of the other keys; a script triggered again
+    while running is restarted.
+
+    In `queued` mode, the scripts run one at a time in arrival order from a
+    bounded queue:
+
+    * A state key already waiting in the queue is not queued twice, the
+      latest trigger replaces the pending one (when `coalesce` is set).
+    * Triggers arriving on a full queue are dropped.
+
+    In both modes, a state key triggered again within `rate_limit` seconds of
+    its last accepted trigger is dropped. Dropped triggers are counted in
+    `dropped`.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        name: str,
+        max_size: int,
+        coalesce: bool = True,
+        rate_limit: float = 0,
+        on_idle: Callable[[], None] | None = None,
+        run_script: Callable[[Script, dict | None, Context | None], Awaitable] | None = None,
+        mode: str = QUEUE_MODE_RESTART,
+    ) -> None:
+        self._hass = hass
+        self._name = name
+        self._max_size = max_size
+        self._coalesce = coalesce
+        self._rate_limit = rate_limit
+        self._on_idle = on_idle
+        self._run_script = run_script
+        self._mode = mode
+        self._pending: OrderedDict[
+            str, tuple[Script, dict | None, Context | None, Trace | None]
+        ] = OrderedDict()
+        self._last_accepted: dict[str, float] = {}
+        self._worker: asyncio.Task | None = None
+        # Runs of the restart mode
+        self._runs: set[asyncio.Task] = set()
+        self.dropped = 0
+        self.coalesced = 0
+
+    @property
+    def depth(self) -> int:
+        """Number of scripts waiting to run."""
+        return len(self._pending)
+
+    @callback
+    def async_put(
+        self,
+        key: str,
+        script: Script,
+        variables: dict | None,
+        context: Context | None,
+        trace: Trace | None = None,
+    ) -> None:
+        """Queue the script of a state key, without waiting for it."""
+        if self._rate_limit:
+            now = time.monotonic()
+            if now - self._last_accepted.get(key, -self._rate_limit) < self._rate_limit:
+                self.dropped += 1
+                return
+            self._last_accepted[key] = now
+
+        if self._mode != QUEUE_MODE_QUEUED:
+            run = self._hass.async_create_task(
+                self._async_run_one(key, script, variables, context, trace)
+            )
+            self._runs.add(run)
+            run.add_done_callback(self._async_run_done)
+            return
+
+        if self._coalesce and key in self._pending:
+            self._pending[key] = (script, variables, context, trace)
+            self.coalesced += 1
+        elif len(self._pending) >= self._max_size:
+            self.dropped += 1
+            _LOGGER.debug(f"{self._name}: queue full, dropping {key}")
+            return
+        else:
+            self._pending[key] = (script, variables, context, trace)
+
+        if self._worker is None:
+            self._worker = self._hass.async_create_task(self._async_run())
+
+    @callback
+    def async_cancel(self) -> None:
+        """Forget the pending scripts and stop the running ones."""
+        self._pending.clear()
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        for run in self._runs:
+            run.cancel()
+
+    async def async_stop(self) -> None:
+        """Stop the pending and running scripts, once they are stopped."""
+        tasks = [*self._runs, *([self._worker] if self._worker is not None else [])]
+        self.async_cancel()
+        # A cancelled run stops its script before returning
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @callback
+    def _async_run_done(self, run: asyncio.Task) -> None:
+        self._runs.discard(run)
+        if not self._runs and self._on_idle is not None:
+            self._on_idle()
+
+    async def _async_run_one(
+        self,
+        key: str,
+        script: Script,
+        variables: dict | None,
+        context: Context | None,
+        trace: Trace | None,
+    ) -> None:
+        if trace is not None:
+            trace.mark(STAGE_RUN_START)
+        try:
+            if self._run_script is not None:
+                await self._run_script(script, variables, context)
+            else:
+                await script.async_run(variables, context=context)
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception(f"{self._name}: error running {key}")
+
+    async def _async_run(self) -> None:
+        try:
+            while self._pending:
+                key, (script, variables, context, trace) = self._pending.popitem(last=False)
+                await self._async_run_one(key, script, variables, context, trace)
+        finally:
+            if self._worker is asyncio.current_task():
+                self._worker = None
+
+        if self._on_idle is not None:
+            self._on_idle()
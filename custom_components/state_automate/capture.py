@@ -0,0 +1,173 @@
+"""Capture of the triggers and script runs of the state_automate entities."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from datetime import timedelta
+import json
+import logging
+import struct
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+_LOGGER = logging.getLogger(__name__)
+
+KIND_TRIGGER = "trigger"
+KIND_UNMATCHED = "unmatched"
+KIND_STATE = "state"
+KIND_SCRIPT = "script"
+KIND_RUN = "run"
+
+BUFFER_SIZE = 4096
+FLUSH_SIZE = 512
+FLUSH_INTERVAL = timedelta(seconds=5)
+
+# Each record is a compact JSON array prefixed by its length
+_FRAME_HEADER = struct.Struct(">I")
+
+
+def _append_frames(path: str, records: list, truncate: bool = False) -> int:
+    """Append records to a capture file, return the number of bytes written."""
+    frames = []
+    for record in records:
+        payload = json.dumps(record, separators=(",", ":"), default=str).encode()
+        frames.append(_FRAME_HEADER.pack(len(payload)))
+        frames.append(payload)
+    data = b"".join(frames)
+    with open(path, "wb" if truncate else "ab") as file:
+        file.write(data)
+    return len(data)
+
+
+def _read_frames(path: str) -> list:
+    """Records of a capture file."""
+    records = []
+    with open(path, "rb") as file:
+        data = file.read()
+    pos = 0
+    while pos + _FRAME_HEADER.size <= len(data):
+        (size,) = _FRAME_HEADER.unpack_from(data, pos)
+        pos += _FRAME_HEADER.size
+        records.append(json.loads(data[pos : pos + size]))
+        pos += size
+    return records
+
+
+def _export(path: str, export_path: str) -> int:
+    records = _read_frames(path)
+    with open(export_path, "w", encoding="utf-8") as file:
+        for record in records:
+            file.write(json.dumps(record, default=str))
+            file.write("\n")
+    return len(records)
+
+
+class TrafficCapture:
+    """
+    Record what the entities receive and run, while a capture is started.
+
+    Records go to a bounded ring buffer, the oldest being dropped when it is
+    full. The buffer is flushed in batches to an append-only file of length
+    prefixed records, encoded and written in the executor.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+        self.active = False
+        self._path = None
+        self._buffer: deque[tuple] = deque(maxlen=BUFFER_SIZE)
+        self._flush_lock = asyncio.Lock()
+        self._flush_scheduled = False
+        self._unsub_flush = None
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        self._records = 0
+        self._dropped = 0
+        self._flushed = 0
+        self._bytes = 0
+        self._record_ns = 0
+
+    @property
+    def stats(self) -> dict:
+        """Counters of the current or last capture."""
+        return {
+            "active": self.active,
+            "path": self._path,
+            "records": self._records,
+            "dropped": self._dropped,
+            "flushed": self._flushed,
+            "bytes": self._bytes,
+            "buffered": len(self._buffer),
+            "record_us": round(self._record_ns / self._records / 1000, 2) if self._records else 0,
+        }
+
+    @callback
+    def async_record(self, kind: str, source: str, *values: Any) -> None:
+        """Buffer a record, callers check `active` first."""
+        start = time.perf_counter_ns()
+        if len(self._buffer) == BUFFER_SIZE:
+            self._dropped += 1
+        self._buffer.append((time.time(), kind, source, *values))
+        self._records += 1
+        if len(self._buffer) >= FLUSH_SIZE and not self._flush_scheduled:
+            self._flush_scheduled = True
+            self._hass.async_create_task(self._async_flush())
+        self._record_ns += time.perf_counter_ns() - start
+
+    async def _async_flush(self, _now=None) -> None:
+        async with self._flush_lock:
+            self._flush_scheduled = False
+            if not self._buffer or self._path is None:
+                return
+            records = list(self._buffer)
+            self._buffer.clear()
+            try:
+                self._bytes += await self._hass.async_add_executor_job(
+                    _append_frames, self._path, records
+                )
+                self._flushed += len(records)
+            except OSError as err:
+                _LOGGER.error(f"Cannot write capture to {self._path}: {err}")
+
+    async def async_start(self, path: str) -> None:
+        """Start a new capture, replacing the content of path."""
+        if self.active:
+            await self.async_stop()
+        await self._hass.async_add_executor_job(_append_frames, path, [], True)
+        self._path = path
+        self._buffer.clear()
+        self._reset_stats()
+        self.active = True
+        self._unsub_flush = async_track_time_interval(
+            self._hass, self._async_flush, FLUSH_INTERVAL
+        )
+        _LOGGER.info(f"Capturing state_automate traffic to {path}")
+
+    async def async_stop(self) -> None:
+        """Stop the capture and write what is still buffered."""
+        if not self.active:
+            return
+        self.active = False
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        await self._async_flush()
+        _LOGGER.info(f"Stopped capturing state_automate traffic: {self.stats}")
+
+    async def async_export(self, export_path: str) -> int:
+        """Write the capture as JSON lines, return the number of records."""
+        if self._path is None:
+            _LOGGER.error("No capture to export")
+            return 0
+        await self._async_flush()
+        try:
+            count = await self._hass.async_add_executor_job(_export, self._path, export_path)
+        except OSError as err:
+            _LOGGER.error(f"Cannot export capture to {export_path}: {err}")
+            return 0
+        _LOGGER.info(f"Exported {count} captured records to {export_path}")
+        return count
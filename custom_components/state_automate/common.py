@@ -1,15 +1,16 @@
-"""Constants for eventsensor."""
+"""Helpers for the state_automate integration."""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
 import re
+from typing import Any, Callable
 
 from homeassistant.const import CONF_EVENT, CONF_EVENT_DATA, CONF_STATE
 from homeassistant.util import slugify
 
-# Base component constants
-DOMAIN = "eventsensor"
-PLATFORM = "sensor"
-DOMAIN_DATA = f"{DOMAIN}_data"
-
-CONF_STATE_MAP = "state_map"
+from .const import CONF_STATE_MAP
 
 PRESET_AQARA_CUBE = "Aqara Cube"
 PRESET_AQARA_CUBE_MAPPING = {
@@ -75,7 +76,15 @@ PRESET_HUE_TAP_MAPPING = {
     17: "3_click",
     18: "4_click",
 }
-_rg_dict_extraction = re.compile(r"({[^{}]+})")
+STATE_MAP_PRESETS = {
+    PRESET_AQARA_CUBE: PRESET_AQARA_CUBE_MAPPING,
+    PRESET_AQARA_SMART_BUTTON: PRESET_AQARA_SMART_BUTTON_MAPPING,
+    PRESET_FOH: PRESET_FOH_MAPPING,
+    PRESET_HUE_DIMMER: PRESET_HUE_DIMMER_MAPPING,
+    PRESET_HUE_TAP: PRESET_HUE_TAP_MAPPING,
+}
+
+_rg_ui_delimiters = re.compile(r"([{}:,])")
 
 
 def make_unique_id(sensor_data: dict) -> str:
@@ -91,6 +100,35 @@ def make_unique_id(sensor_data: dict) -> str:
     return "_".join([event, slugify(str(filter_event)), state, slugify(str(state_map))])
 
 
+def config_hash(config: Any) -> str:
+    """Content hash of a (JSON like) configuration block."""
+    raw = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def compile_state_map(preset: str | None = None, state_map: dict | None = None) -> dict[str, str]:
+    """
+    Merge a preset and a custom state map into a flat lookup.
+
+    Keys are the string forms the raw state can take once stringified,
+    numeric keys being registered both as int and float (`1002`, `1002.0`),
+    so that no number parsing is needed per event.
+    """
+    mapping = dict(STATE_MAP_PRESETS.get(preset, {}))
+    mapping.update(state_map or {})
+
+    lookup = {}
+    for key, value in mapping.items():
+        number = parse_numbers(str(key))
+        if isinstance(number, (int, float)) and math.isfinite(number):
+            lookup[str(number)] = str(value)
+            if number == int(number):
+                lookup[str(int(number))] = str(value)
+                lookup[str(float(number))] = str(value)
+        lookup[str(key)] = str(value)
+    return lookup
+
+
 # Workaround for config entry data being stored as strings always
 def parse_numbers(raw_item):
     """Enable numerical values, like press codes for remotes."""
@@ -129,6 +167,43 @@ def extract_state_from_event(state_key: str, event_data: dict):
     return "bad_state"
 
 
+def compile_state_extractor(state_key: str) -> Callable[[dict], Any]:
+    """
+    Compile `extract_state_from_event` for a given state key.
+
+    Plain keys become a direct lookup, dotted keys a pre-split path.
+    """
+    if "." not in state_key:
+
+        def _extract_key(event_data: dict):
+            if state_key in event_data:
+                return event_data[state_key]
+            return "bad_state"
+
+        return _extract_key
+
+    path = tuple(state_key.split("."))
+    base_key = path[0]
+
+    def _extract_path(event_data: dict):
+        if state_key in event_data:
+            return event_data[state_key]
+        if base_key not in event_data:
+            return "bad_state"
+        try:
+            nested_data = event_data
+            for level in path:
+                nested_data = nested_data[level]
+        except (IndexError, KeyError, TypeError):
+            return "bad_state"
+        # Don't use dicts as state!
+        if isinstance(nested_data, dict):
+            return str(nested_data)
+        return nested_data
+
+    return _extract_path
+
+
 # Workaround lack of UI input field to edit yaml inside a ConfigFlow -> string repr
 def make_string_ui_from_dict(data: dict) -> str:
     """
@@ -146,68 +221,154 @@ def make_string_ui_from_dict(data: dict) -> str:
     return ", ".join(pairs)
 
 
-def _from_str_to_dict(raw_data: str) -> dict:
-    """Assume format `key1: value1, key2: value2, ...`."""
-    raw_pairs = raw_data.split(",")
+def parse_dict_from_ui_string(str_use) -> dict:
+    """
+    Parse a string field into a nested dict.
+
+    Workaround to enable UI edition of a dict, as a 'YAML' input is not available.
 
-    def _parse_item(raw_key: str):
-        return raw_key.lstrip(" ").rstrip(" ").rstrip(":")
+    Assume syntax like:
+    `key1: value1, key2: {subk1: value2, subk2: value3}, ...`
 
-    data_out = {}
-    for pair in raw_pairs:
-        if ":" not in pair:
-            break
-        key, value = pair.split(":", maxsplit=1)
-        data_out[_parse_item(key)] = _parse_item(value)
+    The string is split once at its delimiters, then read token to token.
+    Values may hold colons, and commas when the text after the comma holds
+    no colon. Empty segments between commas are skipped.
+    """
+    data = {}
+    stack = [data]
+    # Text and delimiters alternate, text at even indices
+    tokens = _rg_ui_delimiters.split(str_use)
+    key = None  # key of the value being read, None while reading a key
+    start = 0  # token where the key or value being read starts
+    comma = None  # last comma met in a scalar value, maybe ending it
+
+    def _text(begin: int, end: int) -> str:
+        if begin + 1 == end:
+            return tokens[begin].strip()
+        return "".join(tokens[begin:end]).strip()
+
+    def _before_comma() -> str:
+        # Up to the comma ending the value, without the empty segments before it
+        return _text(start, comma).rstrip(", ")
+
+    def _value(end: int) -> str:
+        if comma is not None and not _text(comma + 1, end):
+            return _before_comma()
+        return _text(start, end)
+
+    for pos in range(1, len(tokens), 2):
+        char = tokens[pos]
+        if key is None:
+            if char == ":":
+                key = tokens[start].strip() if start + 1 == pos else _text(start, pos)
+            elif char == "}" and len(stack) > 1:
+                stack.pop()
+            if char != "{":
+                start = pos + 1
+        elif char == ",":
+            comma = pos
+        elif char == ":":
+            if comma is not None:
+                # The text since the comma was the next key
+                if start + 1 == comma and comma + 2 == pos:
+                    stack[-1][key] = tokens[start].strip()
+                    key = tokens[comma + 1].strip()
+                else:
+                    stack[-1][key] = _before_comma()
+                    key = _text(comma + 1, pos)
+                start = pos + 1
+                comma = None
+        elif char == "{":
+            if comma is None and not _text(start, pos):
+                stack[-1][key] = {}
+                stack.append(stack[-1][key])
+                key = None
+                start = pos + 1
+        else:
+            stack[-1][key] = _value(pos)
+            if len(stack) > 1:
+                stack.pop()
+            key = None
+            start = pos + 1
+            comma = None
+
+    if key is not None:
+        stack[-1][key] = _value(len(tokens))
 
-    return data_out
+    return data
 
 
-def _walk_nested_dict(container: dict, substitutions: dict):
-    for key, value in container.items():
-        if isinstance(value, dict):
-            _walk_nested_dict(value, substitutions)
-        elif value in substitutions:
-            new_value = substitutions[value]
-            if isinstance(new_value, dict):
-                _walk_nested_dict(new_value, substitutions)
+def _compile_alternatives(value: Any):
+    """Turn a `v1 | v2` filter value into the collection of accepted values."""
+    if isinstance(value, str) and "|" in value:
+        return frozenset(v.strip() for v in value.split("|"))
+    try:
+        return frozenset([value])
+    except TypeError:
+        return (value,)
 
-            # Making substitution
-            container[key] = new_value
 
+def _compile_path(key: str) -> tuple:
+    """
+    Pre-split a dotted filter key.
 
-def parse_dict_from_ui_string(str_use) -> dict:
+    Each level keeps the remaining dotted key, as a literal key holding dots
+    takes precedence over walking down the nested dicts.
     """
-    Parse a string field into a nested dict.
+    parts = key.split(".")
+    return tuple(
+        (".".join(parts[i:]), parts[i] if i < len(parts) - 1 else None)
+        for i in range(len(parts))
+    )
 
-    Workaround to enable UI edition of a dict, as a 'YAML' input is not available.
 
-    Assume syntax like:
-    `key1: value1, key2: {subk1: value2, subk2: value3}, ...`
-    """
-    substitutions = {}
-    counter_subs = 0
-    str_subs = str_use
-    count_nesting = 0
-    while "{" in str_subs and count_nesting < 10:
-        count_nesting += 1
-        for found in _rg_dict_extraction.findall(str_subs):
-            parsed_piece = _from_str_to_dict(found[1:-1])
+def _contains(values, value) -> bool:
+    try:
+        return value in values
+    except TypeError:
+        # unhashable event value
+        return False
+
 
-            key_sub = f"SUB{counter_subs:03d}"
-            substitutions[key_sub] = parsed_piece
-            counter_subs += 1
+def compile_event_filter(filter_data: dict) -> Callable[[dict], bool]:
+    """
+    Compile an event data filter into a reusable predicate.
 
-            str_subs = str_subs.replace(found, key_sub, 1)
+    Same semantics as `check_dict_is_contained_in_another`, but the filter is
+    parsed once: alternatives become frozensets and dotted keys pre-split paths.
+    """
+    flat = []
+    nested = []
+    for key, value in filter_data.items():
+        values = _compile_alternatives(value)
+        if "." in key:
+            nested.append((_compile_path(key), values))
+        else:
+            flat.append((key, values))
+    flat = tuple(flat)
+    nested = tuple(nested)
+
+    def _predicate(data: dict) -> bool:
+        for key, values in flat:
+            if key not in data or not _contains(values, data[key]):
+                return False
 
-    # last parse for final root keys
-    data = _from_str_to_dict(str_subs)
+        for path, values in nested:
+            node = data
+            for remaining, head in path:
+                if remaining in node:
+                    if not _contains(values, node[remaining]):
+                        return False
+                    break
+                if head is None or head not in node:
+                    return False
+                node = node[head]
+                if not isinstance(node, dict):
+                    return False
 
-    # Now to substitute values:
-    if substitutions:
-        _walk_nested_dict(data, substitutions)
+        return True
 
-    return data
+    return _predicate
 
 
 def check_dict_is_contained_in_another(filter_data: dict, data: dict) -> bool:
@@ -219,30 +380,8 @@ def check_dict_is_contained_in_another(filter_data: dict, data: dict) -> bool:
       `{"base_key.sub_key": "value"}`
       will look for dicts containing
       `{"base_key": {"sub_key": "value"}}`
-    """
-    for key, value in filter_data.items():            
-        if key in data:
-            lst_val = [value]
-            if "|" in value:
-                lst_val = [v.strip() for v in value.split("|")] 
-            if data[key] not in lst_val:
-                return False
-            continue
-
-        if "." in key:
-            base_key, sub_key = key.split(".", maxsplit=1)
-            if base_key not in data:
-                return False
+    * Alternatives are accepted with `value1 | value2`
 
-            base_value = data[base_key]
-            if not isinstance(base_value, dict):
-                return False
-
-            if not check_dict_is_contained_in_another({sub_key: value}, base_value):
-                return False
-
-            continue
-
-        return False
-
-    return True
+    Prefer `compile_event_filter` when the same filter is checked repeatedly.
+    """
+    return compile_event_filter(filter_data)(data)
@@ -0,0 +1,42 @@
+"""Validation of the State Automate YAML configuration."""
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from homeassistant.const import __version__ as HA_VERSION
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.typing import ConfigType
+from homeassistant.loader import async_get_integration
+
+from . import CONFIG_SCHEMA, _normalize
+from .common import config_hash
+from .const import DOMAIN, STORAGE_KEY_CONFIG, STORAGE_VERSION_CONFIG
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_validate_config(hass: HomeAssistant, config: ConfigType) -> ConfigType:
+    """
+    Validate the configuration, or reuse the last validation of the same one.
+
+    The validated `state_automate` block is stored, normalized, along with the
+    hash of the YAML it comes from and of the Home Assistant and integration
+    versions. A restart or reload with unchanged YAML takes it from there
+    without running the schema.
+    """
+    if DOMAIN not in config:
+        return CONFIG_SCHEMA(config)
+
+    integration = await async_get_integration(hass, DOMAIN)
+    digest = config_hash([HA_VERSION, str(integration.version), config[DOMAIN]])
+    store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION_CONFIG, STORAGE_KEY_CONFIG)
+    snapshot = await store.async_load()
+    if snapshot is not None and snapshot.get("hash") == digest:
+        _LOGGER.debug("Configuration unchanged, validation skipped")
+        return {**config, DOMAIN: snapshot["config"]}
+
+    validated = CONFIG_SCHEMA(config)
+    await store.async_save({"hash": digest, "config": _normalize(validated[DOMAIN])})
+    return validated
@@ -1,20 +1,36 @@
 """Config flow for StateAutomate."""
 import logging
 
+import voluptuous as vol  # pylint: disable=import-error
+
 from homeassistant import config_entries
+from homeassistant.core import callback
 from homeassistant.util import slugify
 from homeassistant.const import ( # pylint: disable=import-error
     CONF_NAME,
     CONF_ENTITY_ID,
+    CONF_EVENT_DATA,
 )
 
+from .common import make_string_ui_from_dict, parse_dict_from_ui_string, parse_numbers
 from .const import (
     CONF_EVENT_TYPE,
     CONF_EVENT_VALUE,
+    CONF_STATE_MAP,
     DOMAIN,
 )
 _LOGGER = logging.getLogger(__name__)
 
+
+def entry_unique_id(user_input: dict) -> str:
+    """Unique id of the config entry of a YAML item."""
+    if CONF_NAME in user_input:
+        return f'{DOMAIN}_{slugify(user_input[CONF_NAME])}'
+    if CONF_ENTITY_ID in user_input:
+        return f'{DOMAIN}_{user_input[CONF_ENTITY_ID]}'
+    return f'{DOMAIN}_{user_input[CONF_EVENT_TYPE]}_{user_input[CONF_EVENT_VALUE]}'
+
+
 @config_entries.HANDLERS.register(DOMAIN)
 class StateAutomateFlowHandler(config_entries.ConfigFlow):
     """Config flow for StateAutomate component."""
@@ -27,6 +43,12 @@ class StateAutomateFlowHandler(config_entries.ConfigFlow):
         """Init StateAutomateFlowHandler."""
         self._errors = {}
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Get the options flow for this handler."""
+        return StateAutomateOptionsFlowHandler(config_entry)
+
     async def async_step_import(self, user_input=None):
         """Handle configuration by yaml file."""
         self._is_import = True
@@ -39,14 +61,12 @@ class StateAutomateFlowHandler(config_entries.ConfigFlow):
         title = ""
 
         if user_input is not None:
+            await self.async_set_unique_id(entry_unique_id(user_input))
             if CONF_NAME in user_input:
-                await self.async_set_unique_id(f'{DOMAIN}_{slugify(user_input[CONF_NAME])}')
                 title = user_input[CONF_NAME]
             elif CONF_ENTITY_ID in user_input:
-                await self.async_set_unique_id(f'{DOMAIN}_{user_input[CONF_ENTITY_ID]}')
                 title = f"State Automate: {user_input[CONF_ENTITY_ID]}"
             else:
-                await self.async_set_unique_id(f'{DOMAIN}_{user_input[CONF_EVENT_TYPE]}_{user_input[CONF_EVENT_VALUE]}')
                 title = f"State Automate: {user_input[CONF_EVENT_TYPE]}"
             self._abort_if_unique_id_configured(user_input)
 
@@ -63,3 +83,45 @@ class StateAutomateFlowHandler(config_entries.ConfigFlow):
         )
 
 
+class StateAutomateOptionsFlowHandler(config_entries.OptionsFlow):
+    """
+    Options flow for StateAutomate.
+
+    The event filter and the state map are edited as `key: value, ...`
+    strings, there being no YAML field in the UI. They apply over the YAML.
+    """
+
+    def __init__(self, config_entry):
+        """Init StateAutomateOptionsFlowHandler."""
+        self.config_entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Edit the event filter and the state map."""
+        config = {**self.config_entry.data, **self.config_entry.options}
+        fields = [CONF_STATE_MAP]
+        if CONF_EVENT_TYPE in config:
+            fields.insert(0, CONF_EVENT_DATA)
+
+        if user_input is not None:
+            options = {
+                field: parse_dict_from_ui_string(user_input.get(field, ""))
+                for field in fields
+            }
+            if CONF_EVENT_DATA in options:
+                # Numeric event values, as press codes, are compared as numbers
+                options[CONF_EVENT_DATA] = parse_numbers(options[CONF_EVENT_DATA])
+            _LOGGER.debug(f"async_step_init: {options}")
+            return self.async_create_entry(title="", data=options)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        field,
+                        default=make_string_ui_from_dict(config.get(field, {})),
+                    ): str
+                    for field in fields
+                }
+            ),
+        )
@@ -5,10 +5,59 @@ PLATFORMS = ["select"]
 
 SIGNAL_STATE_UPDATED = "{}.updated".format(DOMAIN)
 
+DATA_DISPATCHER = "{}_dispatcher".format(DOMAIN)
+DATA_STATE_ROUTER = "{}_state_router".format(DOMAIN)
+DATA_ENTITIES = "{}_entities".format(DOMAIN)
+DATA_SCRIPT_CACHE = "{}_script_cache".format(DOMAIN)
+DATA_CALL_TRACKER = "{}_call_tracker".format(DOMAIN)
+DATA_SCHEDULER = "{}_scheduler".format(DOMAIN)
+DATA_TIMER_WHEEL = "{}_timer_wheel".format(DOMAIN)
+DATA_CAPTURE = "{}_capture".format(DOMAIN)
+
+# Snapshot of the validated YAML configuration, reused while it is unchanged
+STORAGE_KEY_CONFIG = "{}.config".format(DOMAIN)
+STORAGE_VERSION_CONFIG = 1
+
+SERVICE_GET_STATS = "get_stats"
+SERVICE_CAPTURE_START = "capture_start"
+SERVICE_CAPTURE_STOP = "capture_stop"
+SERVICE_CAPTURE_EXPORT = "capture_export"
+EVENT_STATS = "{}_stats".format(DOMAIN)
+
 KEY_ENTER = "enter"
 KEY_LEAVE = "leave"
 
+# Script variable holding the state that triggered it
+ATTR_CODE = "code"
+
 CONF_ACTIVITIES = "activities"
 CONF_STATES = "states"
 CONF_EVENT_TYPE = "event_type"
 CONF_EVENT_VALUE = "event_value"
+CONF_DEVICES = "devices"
+CONF_TRANSITION = "transition"
+CONF_DIFF_TRANSITIONS = "diff_transitions"
+CONF_SKIP_SATISFIED = "skip_satisfied"
+CONF_MERGE_CALLS = "merge_calls"
+CONF_QUEUE_MODE = "queue_mode"
+CONF_QUEUE_SIZE = "queue_size"
+CONF_COALESCE = "coalesce"
+CONF_RATE_LIMIT = "rate_limit"
+CONF_STATS = "stats"
+CONF_STATE_MAP = "state_map"
+CONF_STATE_PRESET = "state_preset"
+CONF_COMMAND_GAP = "command_gap"
+CONF_SUPERSEDE = "supersede"
+CONF_TRANSPORTS = "transports"
+CONF_GESTURE_WINDOW = "gesture_window"
+CONF_HOLD_TIME = "hold_time"
+
+DEFAULT_QUEUE_SIZE = 10
+DEFAULT_GESTURE_WINDOW = 0.4
+DEFAULT_HOLD_TIME = 0.8
+
+QUEUE_MODE_RESTART = "restart"
+QUEUE_MODE_QUEUED = "queued"
+
+TRANSITION_SEQUENTIAL = "sequential"
+TRANSITION_PARALLEL = "parallel"
@@ -0,0 +1,24 @@
+"""Diagnostics support for State Automate."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_ACTIVITIES, DATA_CAPTURE, DATA_ENTITIES, DATA_SCHEDULER, DATA_SCRIPT_CACHE, DOMAIN
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    config = hass.data[DOMAIN].get(config_entry.entry_id, {})
+    entity = hass.data[DATA_ENTITIES].get(config_entry.entry_id)
+    return {
+        "activities": [act["name"] for act in config.get(CONF_ACTIVITIES, [])],
+        "script_cache": hass.data[DATA_SCRIPT_CACHE].stats,
+        "latency": entity.latency_stats if entity is not None else None,
+        "lanes": hass.data[DATA_SCHEDULER].stats,
+        "capture": hass.data[DATA_CAPTURE].stats,
+    }
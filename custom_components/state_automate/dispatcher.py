@@ -0,0 +1,237 @@
+"""Shared event and state dispatchers for the state_automate select entities."""
+from __future__ import annotations
+
+import logging
+from typing import Any, Callable, Mapping
+
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, State, callback
+from homeassistant.helpers.event import async_track_state_change_event
+
+from .capture import KIND_UNMATCHED, TrafficCapture
+from .common import compile_event_filter
+
+_LOGGER = logging.getLogger(__name__)
+
+# Event data keys that usually identify a single device, tried first when
+# picking the key a filter is indexed by.
+SELECTIVE_KEYS = ("device_ieee", "unique_id", "device_id", "id", "entity_id")
+
+
+def _index_key(event_data: dict) -> str | None:
+    """Pick the most selective top-level key of an event_data filter."""
+    keys = [k for k, v in event_data.items() if "." not in k and isinstance(v, str)]
+    for key in SELECTIVE_KEYS:
+        if key in keys:
+            return key
+    return keys[0] if keys else None
+
+
+class _Registration:
+    """An event_data filter and the handler it feeds."""
+
+    __slots__ = ("event_data", "predicate", "target")
+
+    def __init__(self, event_data: dict, target: Callable[[Event], Any]) -> None:
+        self.event_data = event_data
+        self.predicate = compile_event_filter(event_data)
+        self.target = target
+
+
+class _EventRoute:
+    """Single bus listener for one event type, indexing its registrations."""
+
+    def __init__(
+        self, hass: HomeAssistant, event_type: str, capture: TrafficCapture | None = None
+    ) -> None:
+        self._hass = hass
+        self.event_type = event_type
+        self._capture = capture
+        # key -> value -> registrations
+        self._index: dict[str, dict[str, list[_Registration]]] = {}
+        self._unindexed: list[_Registration] = []
+        self._count = 0
+        self._unsub = hass.bus.async_listen(
+            event_type, self._async_handle_event, event_filter=self._async_filter_event
+        )
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _buckets(self, reg: _Registration):
+        key = _index_key(reg.event_data)
+        if key is None:
+            return None, ()
+        value = reg.event_data[key]
+        values = {value}
+        if "|" in value:
+            values = {v.strip() for v in value.split("|")}
+        return key, values
+
+    @callback
+    def async_add(self, reg: _Registration) -> None:
+        self._count += 1
+        key, values = self._buckets(reg)
+        if key is None:
+            self._unindexed.append(reg)
+            return
+        buckets = self._index.setdefault(key, {})
+        for value in values:
+            buckets.setdefault(value, []).append(reg)
+
+    @callback
+    def async_remove(self, reg: _Registration) -> None:
+        self._count -= 1
+        key, values = self._buckets(reg)
+        if key is None:
+            self._unindexed.remove(reg)
+            return
+        buckets = self._index[key]
+        for value in values:
+            buckets[value].remove(reg)
+            if not buckets[value]:
+                del buckets[value]
+        if not buckets:
+            del self._index[key]
+
+    @callback
+    def async_close(self) -> None:
+        self._unsub()
+
+    def _indexed(self, data: dict):
+        """Registrations indexed under one of the key/value pairs of data."""
+        for key, buckets in self._index.items():
+            if key not in data:
+                continue
+            try:
+                regs = buckets.get(data[key])
+            except TypeError:
+                # unhashable value, cannot match a string filter
+                continue
+            if regs:
+                yield from regs
+
+    @callback
+    def _async_filter_event(self, event: Event | Mapping[str, Any]) -> bool:
+        """
+        Tell the bus if the event can match a registration.
+
+        Run synchronously by the bus, the events rejected here do not get
+        a listener call scheduled at all. The bus passes the event up to Home
+        Assistant 2024.3, only its data from 2024.4 on.
+        """
+        if self._unindexed:
+            return True
+        data = event.data if isinstance(event, Event) else event
+        for _ in self._indexed(data):
+            return True
+        if self._capture is not None and self._capture.active:
+            self._capture.async_record(KIND_UNMATCHED, self.event_type, data)
+        return False
+
+    @callback
+    def _async_handle_event(self, event: Event) -> None:
+        data = event.data
+        matched = False
+        for reg in [*self._unindexed, *self._indexed(data)]:
+            if reg.predicate(data):
+                matched = True
+                reg.target(event)
+        if not matched and self._capture is not None and self._capture.active:
+            self._capture.async_record(KIND_UNMATCHED, self.event_type, data)
+
+
+class EventDispatcher:
+    """
+    Route bus events to the select entities listening for them.
+
+    One bus listener is kept per event type. Registered filters are indexed by
+    their most selective key/value so an event only gets checked against the
+    few entities that can possibly match it.
+    """
+
+    def __init__(self, hass: HomeAssistant, capture: TrafficCapture | None = None) -> None:
+        self._hass = hass
+        self._capture = capture
+        self._routes: dict[str, _EventRoute] = {}
+
+    @callback
+    def async_register(
+        self, event_type: str, event_data: dict, target: Callable[[Event], Any]
+    ) -> CALLBACK_TYPE:
+        """
+        Call target with every event of event_type matching event_data.
+
+        target is a callback run in the event loop, it must not block.
+        """
+        route = self._routes.get(event_type)
+        if route is None:
+            route = self._routes[event_type] = _EventRoute(
+                self._hass, event_type, self._capture
+            )
+            _LOGGER.debug(f"Listening to {event_type}")
+
+        reg = _Registration(event_data or {}, target)
+        route.async_add(reg)
+
+        @callback
+        def _unregister() -> None:
+            route.async_remove(reg)
+            if not len(route) and self._routes.get(event_type) is route:
+                route.async_close()
+                del self._routes[event_type]
+                _LOGGER.debug(f"Stopped listening to {event_type}")
+
+        return _unregister
+
+
+class StateRouter:
+    """
+    Route the state changes of source entities to the select entities.
+
+    Each source entity id has a single state change subscription, whatever
+    the number of entities it triggers; watching a new entity id leaves the
+    subscriptions of the others alone. Changes of the attributes alone are not
+    routed.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+        self._targets: dict[str, list[Callable[[State], Any]]] = {}
+        self._unsubs: dict[str, CALLBACK_TYPE] = {}
+
+    @callback
+    def async_register(self, entity_id: str, target: Callable[[State], Any]) -> CALLBACK_TYPE:
+        """
+        Call target with the new state of entity_id every time it changes.
+
+        target is a callback run in the event loop, it must not block.
+        """
+        targets = self._targets.get(entity_id)
+        if targets is None:
+            targets = self._targets[entity_id] = []
+            self._unsubs[entity_id] = async_track_state_change_event(
+                self._hass, entity_id, self._async_handle_event
+            )
+            _LOGGER.debug(f"Listening to {entity_id} state")
+        targets.append(target)
+
+        @callback
+        def _unregister() -> None:
+            targets.remove(target)
+            if not targets and self._targets.get(entity_id) is targets:
+                del self._targets[entity_id]
+                self._unsubs.pop(entity_id)()
+                _LOGGER.debug(f"Stopped listening to {entity_id} state")
+
+        return _unregister
+
+    @callback
+    def _async_handle_event(self, event: Event) -> None:
+        new_state = event.data.get("new_state")
+        if new_state is None:
+            return
+        old_state = event.data.get("old_state")
+        if old_state is not None and old_state.state == new_state.state:
+            return
+        for target in list(self._targets.get(event.data["entity_id"], ())):
+            target(new_state)
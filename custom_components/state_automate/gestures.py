@@ -0,0 +1,193 @@
+"""Double press, hold and repeat gestures recognized from the timing of the states."""
+from __future__ import annotations
+
+import math
+import time
+from typing import Callable
+
+from homeassistant.core import HomeAssistant, callback
+
+from .state_table import StateTable
+from .stats import Trace
+
+SUFFIX_DOUBLE = ":double"
+SUFFIX_HOLD = ":hold"
+SUFFIX_REPEAT = ":repeat"
+
+TICK = 0.05
+WHEEL_SLOTS = 64
+
+
+class _Timer:
+    __slots__ = ("action", "rounds", "cancelled")
+
+    def __init__(self, action: Callable[[], None], rounds: int) -> None:
+        self.action = action
+        self.rounds = rounds
+        self.cancelled = False
+
+
+class TimerWheel:
+    """
+    Timers of all the gesture engines, driven by a single loop timer.
+
+    Timers are hashed into slots by their due tick. The loop timer only
+    ticks while some timer is pending; a timer fires at most one tick late.
+    """
+
+    def __init__(self, hass: HomeAssistant, tick: float = TICK) -> None:
+        self._hass = hass
+        self._tick = tick
+        self._slots: list[list[_Timer]] = [[] for _ in range(WHEEL_SLOTS)]
+        self._cursor = 0
+        self._pending = 0
+        self._next_at = 0.0
+        self._handle = None
+
+    @callback
+    def async_schedule(self, delay: float, action: Callable[[], None]) -> Callable[[], None]:
+        """Run action after delay seconds, return a callback cancelling it."""
+        loop = self._hass.loop
+        if self._handle is None:
+            self._next_at = loop.time() + self._tick
+            self._handle = loop.call_at(self._next_at, self._async_tick)
+        # Ticks until the first one at or after the due time
+        ticks = max(1, math.ceil((loop.time() + delay - self._next_at) / self._tick) + 1)
+        timer = _Timer(action, (ticks - 1) // WHEEL_SLOTS)
+        self._slots[(self._cursor + ticks) % WHEEL_SLOTS].append(timer)
+        self._pending += 1
+
+        @callback
+        def _cancel() -> None:
+            if not timer.cancelled:
+                timer.cancelled = True
+                self._pending -= 1
+
+        return _cancel
+
+    @callback
+    def _async_tick(self) -> None:
+        self._cursor = (self._cursor + 1) % WHEEL_SLOTS
+        slot = self._slots[self._cursor]
+        due = []
+        waiting = []
+        for timer in slot:
+            if timer.cancelled:
+                continue
+            if timer.rounds:
+                timer.rounds -= 1
+                waiting.append(timer)
+            else:
+                timer.cancelled = True
+                self._pending -= 1
+                due.append(timer)
+        self._slots[self._cursor] = waiting
+
+        if self._pending:
+            self._next_at += self._tick
+            self._handle = self._hass.loop.call_at(self._next_at, self._async_tick)
+        else:
+            self._handle = None
+            for slot in self._slots:
+                slot.clear()
+
+        for timer in due:
+            timer.action()
+
+
+class _Burst:
+    """Presses of one key, each within the window of the previous one."""
+
+    __slots__ = ("count", "first_at", "last_at", "held", "double", "cancel")
+
+    def __init__(self, now: float) -> None:
+        self.count = 1
+        self.first_at = now
+        self.last_at = now
+        self.held = False
+        self.double = False
+        self.cancel = None
+
+
+class GestureEngine:
+    """
+    Turn the presses of a key into the gesture keys the activity handles.
+
+    A key received again within `window` seconds of its previous press is
+    part of the same burst:
+
+    * `<key>:repeat` fires on every press of a burst but the first.
+    * `<key>:hold` fires once when a burst lasts `hold_time` seconds, the
+      remote repeating the key while it is held. The burst is a hold, it
+      fires no single or double press.
+    * `<key>:double` fires when a burst ends after exactly two presses,
+      `<key>` when it ends after one.
+
+    `<key>` fires right away when the activity has no `<key>:double`.
+    """
+
+    def __init__(
+        self,
+        wheel: TimerWheel,
+        window: float,
+        hold_time: float,
+        fire: Callable[[str, str, Trace | None], None],
+    ) -> None:
+        self._wheel = wheel
+        self._window = window
+        self._hold_time = hold_time
+        self._fire = fire
+        self._bursts: dict[str, _Burst] = {}
+
+    @callback
+    def async_press(self, state: str, table: StateTable, trace: Trace | None = None) -> None:
+        """Handle a press, fire(key, state, trace) is called for each gesture key."""
+        double = f"{state}{SUFFIX_DOUBLE}" in table
+        hold = f"{state}{SUFFIX_HOLD}" in table
+        repeat = f"{state}{SUFFIX_REPEAT}" in table
+        if not (double or hold or repeat):
+            self._fire(state, state, trace)
+            return
+
+        now = time.monotonic()
+        burst = self._bursts.get(state)
+        if burst is None or now - burst.last_at > self._window:
+            if burst is not None:
+                # Its end may not have ticked yet
+                burst.cancel()
+                self._async_burst_ended(state, burst)
+            burst = self._bursts[state] = _Burst(now)
+            if not double:
+                self._fire(state, state, trace)
+        else:
+            burst.count += 1
+            burst.last_at = now
+            burst.cancel()
+            if repeat:
+                self._fire(f"{state}{SUFFIX_REPEAT}", state, trace)
+            if hold and not burst.held and now - burst.first_at >= self._hold_time:
+                burst.held = True
+                self._fire(f"{state}{SUFFIX_HOLD}", state, trace)
+
+        burst.double = double
+        burst.cancel = self._wheel.async_schedule(
+            self._window, lambda: self._async_burst_ended(state, burst)
+        )
+
+    @callback
+    def _async_burst_ended(self, state: str, burst: _Burst) -> None:
+        if self._bursts.get(state) is burst:
+            del self._bursts[state]
+        if burst.held or not burst.double:
+            return
+        if burst.count == 1:
+            self._fire(state, state, None)
+        elif burst.count == 2:
+            self._fire(f"{state}{SUFFIX_DOUBLE}", state, None)
+
+    @callback
+    def async_clear(self) -> None:
+        """Forget the bursts in progress, without firing them."""
+        for burst in self._bursts.values():
+            burst.cancel()
+        self._bursts.clear()
@@ -0,0 +1,201 @@
+"""Spot the service calls of a script whose targets are already in the wanted state."""
+from __future__ import annotations
+
+from typing import Any, Callable
+from weakref import WeakKeyDictionary
+
+from homeassistant.const import STATE_OFF, STATE_ON
+from homeassistant.core import HomeAssistant, State
+from homeassistant.helpers.script import Script
+from homeassistant.helpers.template import Template
+
+LIGHT_ATTRIBUTES = (
+    "brightness",
+    "color_temp",
+    "effect",
+    "hs_color",
+    "rgb_color",
+    "rgbw_color",
+    "rgbww_color",
+    "xy_color",
+)
+MEDIA_PLAYER_ON_STATES = ("on", "idle", "playing", "paused", "buffering")
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, tuple):
+        return [_plain(v) for v in value]
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    return value
+
+
+def _attributes_match(state: State, data: dict) -> bool:
+    return all(_plain(state.attributes.get(k)) == _plain(v) for k, v in data.items())
+
+
+def _state_is(value: str) -> Callable[[State, dict], bool]:
+    return lambda state, data: state.state == value
+
+
+def _on_with_attributes(state: State, data: dict) -> bool:
+    return state.state == STATE_ON and _attributes_match(state, data)
+
+
+def _media_player_on(state: State, data: dict) -> bool:
+    return state.state in MEDIA_PLAYER_ON_STATES
+
+
+def _option_is(key: str) -> Callable[[State, dict], bool]:
+    return lambda state, data: state.state == data[key]
+
+
+# (domain, service) -> (data keys the check understands, check)
+# The data keys are all required, but for light.turn_on where they are optional.
+SERVICE_CHECKS: dict[tuple[str, str], tuple[tuple, Callable[[State, dict], bool]]] = {
+    ("light", "turn_on"): (LIGHT_ATTRIBUTES, _on_with_attributes),
+    ("light", "turn_off"): ((), _state_is(STATE_OFF)),
+    ("switch", "turn_on"): ((), _state_is(STATE_ON)),
+    ("switch", "turn_off"): ((), _state_is(STATE_OFF)),
+    ("fan", "turn_on"): ((), _state_is(STATE_ON)),
+    ("fan", "turn_off"): ((), _state_is(STATE_OFF)),
+    ("input_boolean", "turn_on"): ((), _state_is(STATE_ON)),
+    ("input_boolean", "turn_off"): ((), _state_is(STATE_OFF)),
+    ("media_player", "turn_on"): ((), _media_player_on),
+    ("media_player", "turn_off"): ((), _state_is(STATE_OFF)),
+    ("media_player", "select_source"): (("source",), _attributes_match),
+    ("media_player", "volume_set"): (("volume_level",), _attributes_match),
+    ("media_player", "volume_mute"): (("is_volume_muted",), _attributes_match),
+    ("input_select", "select_option"): (("option",), _option_is("option")),
+    ("select", "select_option"): (("option",), _option_is("option")),
+    ("climate", "set_hvac_mode"): (("hvac_mode",), _option_is("hvac_mode")),
+    ("cover", "open_cover"): ((), _state_is("open")),
+    ("cover", "close_cover"): ((), _state_is("closed")),
+}
+
+
+def _static(value: Any) -> bool:
+    if isinstance(value, Template):
+        return value.is_static
+    if isinstance(value, dict):
+        return all(_static(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return all(_static(v) for v in value)
+    return True
+
+
+def _entity_ids(step: dict) -> list[str] | None:
+    target = dict(step.get("target", {}))
+    if "entity_id" in step:
+        target["entity_id"] = step["entity_id"]
+    if set(target) != {"entity_id"}:
+        # device_id/area_id targets are not resolved here
+        return None
+    entity_ids = target["entity_id"]
+    if isinstance(entity_ids, str):
+        entity_ids = [entity_ids]
+    if not entity_ids or not all(isinstance(e, str) for e in entity_ids):
+        return None
+    return [e.strip() for e in entity_ids]
+
+
+def compile_step_check(step: dict) -> Callable[[HomeAssistant], bool] | None:
+    """
+    Build a check telling if a service call step would change nothing.
+
+    Return None when the step is not a static call to a known service.
+    """
+    service = step.get("service")
+    if not isinstance(service, str) or "." not in service or not _static(step):
+        return None
+    known = SERVICE_CHECKS.get(tuple(service.split(".", maxsplit=1)))
+    if known is None:
+        return None
+    keys, check = known
+
+    data = step.get("data", {})
+    if not set(data).issubset(keys):
+        return None
+    if check is not _on_with_attributes and len(data) != len(keys):
+        return None
+    data = {k: v.template if isinstance(v, Template) else v for k, v in data.items()}
+    entity_ids = _entity_ids(step)
+    if entity_ids is None:
+        return None
+
+    def _is_satisfied(hass: HomeAssistant) -> bool:
+        for entity_id in entity_ids:
+            state = hass.states.get(entity_id)
+            if state is None or not check(state, data):
+                return False
+        return True
+
+    return _is_satisfied
+
+
+def _step_entity_ids(step: dict) -> list[str] | None:
+    """Entity ids a static service call step touches, None for any other step."""
+    if not isinstance(step.get("service"), str) or not _static(step):
+        return None
+    return _entity_ids(step)
+
+
+class SatisfiedCallsFilter:
+    """
+    Drop, at run time, the service calls of a script that would change nothing.
+
+    The steps are all checked before the script runs, so a step is only
+    skipped when the state it is checked against cannot change before it
+    runs: no kept step before it touches its entities, and all the steps
+    before it are static service calls (no delay, wait, template, ...).
+
+    The checks of a script are compiled on its first run. A script variant is
+    built, and cached, per combination of steps skipped.
+    """
+
+    def __init__(self, hass: HomeAssistant, build_script: Callable[[list], Script]) -> None:
+        self._hass = hass
+        self._build_script = build_script
+        # script -> ((step check, step entity ids) list, skipped steps mask -> script variant)
+        self._scripts: WeakKeyDictionary[Script, tuple[list, dict]] = WeakKeyDictionary()
+
+    def async_filter(self, script: Script | None) -> tuple[Script | None, int]:
+        """Return the script to run and the number of calls skipped."""
+        if script is None:
+            return None, 0
+        if script not in self._scripts:
+            self._scripts[script] = (
+                [(compile_step_check(step), _step_entity_ids(step)) for step in script.sequence],
+                {},
+            )
+        checks, variants = self._scripts[script]
+
+        mask = []
+        touched = set()
+        for check, entity_ids in checks:
+            if (
+                touched is not None
+                and check is not None
+                and touched.isdisjoint(entity_ids)
+                and check(self._hass)
+            ):
+                mask.append(True)
+                continue
+            mask.append(False)
+            if touched is not None:
+                if entity_ids is None:
+                    # The states may change from here on
+                    touched = None
+                else:
+                    touched.update(entity_ids)
+        mask = tuple(mask)
+        skipped = sum(mask)
+        if not skipped:
+            return script, 0
+        if skipped == len(mask):
+            return None, skipped
+        if mask not in variants:
+            variants[mask] = self._build_script(
+                [step for step, skip in zip(script.sequence, mask) if not skip]
+            )
+        return variants[mask], skipped
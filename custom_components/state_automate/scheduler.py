@@ -0,0 +1,190 @@
+"""Command lanes shared by all the state_automate entities, one per device."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+import logging
+import time
+from typing import Awaitable, Callable
+from weakref import WeakKeyDictionary
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.script import Script
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _targets(step: dict) -> tuple[str, ...] | None:
+    """Entity ids a static service call step targets, None for other steps."""
+    if not isinstance(step.get("service"), str):
+        return None
+    target = dict(step.get("target", {}))
+    if "entity_id" in step:
+        target["entity_id"] = step["entity_id"]
+    entity_ids = target.get("entity_id")
+    if isinstance(entity_ids, str):
+        entity_ids = [entity_ids]
+    if not isinstance(entity_ids, list):
+        return None
+    return tuple(e.strip() for e in entity_ids if isinstance(e, str))
+
+
+class _Waiter:
+    __slots__ = ("future", "key")
+
+    def __init__(self, future: asyncio.Future, key: tuple | None) -> None:
+        self.future = future
+        self.key = key
+
+
+class _Lane:
+    """Ordered commands of one device, with the gap to leave between them."""
+
+    def __init__(self) -> None:
+        self.waiters: deque[_Waiter] = deque()
+        self.busy = False
+        self.done_at = 0.0
+        self.gap = 0.0
+        self.runs = 0
+        self.superseded = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "depth": len(self.waiters),
+            "busy": self.busy,
+            "runs": self.runs,
+            "superseded": self.superseded,
+            "wait_avg_ms": round(self.wait_total / self.runs * 1000, 1) if self.runs else 0,
+            "wait_max_ms": round(self.wait_max * 1000, 1),
+        }
+
+
+class CommandScheduler:
+    """
+    Run the scripts driving the same device one at a time, across entities.
+
+    A script holds the lanes of all the devices its service calls target
+    while it runs, and only starts `gap` seconds after the last script that
+    held one of them. A lane is named after the device entity id, or after
+    the transport (an IR hub, ...) the entity sends its commands through.
+
+    The granularity is the whole script: the gap is left between scripts,
+    not between the service calls of one script, and the lanes stay held
+    through its delay and wait steps.
+
+    With `supersede`, a script still waiting for a lane is dropped when a
+    newer one calling the same services on the same devices is queued.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+        self._lanes: dict[str, _Lane] = {}
+        # script -> (targeted entity ids, supersede key)
+        self._scripts: WeakKeyDictionary[Script, tuple[frozenset, tuple]] = WeakKeyDictionary()
+
+    @property
+    def stats(self) -> dict:
+        """Depth and wait times of each lane."""
+        return {name: lane.as_dict() for name, lane in self._lanes.items()}
+
+    def _script_targets(self, script: Script) -> tuple[frozenset, tuple]:
+        if script not in self._scripts:
+            calls = []
+            for step in script.sequence:
+                targets = _targets(step)
+                if targets:
+                    calls.append((step["service"], targets))
+            self._scripts[script] = (
+                frozenset(e for _, targets in calls for e in targets),
+                tuple(calls),
+            )
+        return self._scripts[script]
+
+    async def _async_acquire(self, name: str, key: tuple | None) -> bool:
+        """Wait for a lane, return False when superseded meanwhile."""
+        lane = self._lanes.setdefault(name, _Lane())
+        if not lane.busy and not lane.waiters:
+            lane.busy = True
+            return True
+
+        if key is not None:
+            for waiter in lane.waiters:
+                if waiter.key == key and not waiter.future.done():
+                    lane.waiters.remove(waiter)
+                    lane.superseded += 1
+                    waiter.future.set_result(False)
+                    break
+
+        waiter = _Waiter(self._hass.loop.create_future(), key)
+        lane.waiters.append(waiter)
+        try:
+            return await waiter.future
+        except asyncio.CancelledError:
+            if waiter in lane.waiters:
+                lane.waiters.remove(waiter)
+            elif waiter.future.done() and not waiter.future.cancelled() and waiter.future.result():
+                # Granted right before being cancelled
+                self._release(name, lane.gap)
+            raise
+
+    def _release(self, name: str, gap: float) -> None:
+        lane = self._lanes[name]
+        lane.done_at = time.monotonic()
+        lane.gap = gap
+        while lane.waiters:
+            waiter = lane.waiters.popleft()
+            # A cancelled waiter may not have left the lane yet
+            if not waiter.future.done():
+                waiter.future.set_result(True)
+                return
+        lane.busy = False
+
+    async def async_run(
+        self,
+        script: Script,
+        run: Callable[[], Awaitable],
+        transports: dict[str, str] | None = None,
+        gap: float = 0,
+        supersede: bool = False,
+    ) -> bool:
+        """
+        Run a script once the lanes of its devices are free.
+
+        transports maps device entity ids to the lane they share.
+        Return False when the script was superseded before running.
+        """
+        targets, key = self._script_targets(script)
+        transports = transports or {}
+        # Always taken in the same order, two scripts cannot wait on each other
+        names = sorted({transports.get(entity_id, entity_id) for entity_id in targets})
+        if not names:
+            await run()
+            return True
+
+        queued_at = time.monotonic()
+        acquired = []
+        try:
+            for name in names:
+                if not await self._async_acquire(name, key if supersede else None):
+                    _LOGGER.debug(f"Superseded command for {name}")
+                    return False
+                acquired.append(name)
+
+            lanes = [self._lanes[name] for name in names]
+            delay = max(lane.done_at + max(lane.gap, gap) for lane in lanes) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            waited = time.monotonic() - queued_at
+            for lane in lanes:
+                lane.runs += 1
+                lane.wait_total += waited
+                lane.wait_max = max(lane.wait_max, waited)
+            await run()
+            return True
+        finally:
+            for name in acquired:
+                self._release(name, gap)
+
@@ -0,0 +1,70 @@
+"""Validated activity scripts, shared by all the state_automate entities."""
+from __future__ import annotations
+
+from collections import Counter
+import logging
+from types import MappingProxyType
+from typing import Mapping
+
+import voluptuous as vol
+import homeassistant.helpers.config_validation as cv
+
+from homeassistant.core import callback
+
+from .common import config_hash
+
+SCRIPT_SCHEMA = vol.Schema(cv.SCRIPT_SCHEMA)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ScriptCache:
+    """
+    Content addressed store of validated activity scripts.
+
+    Identical activities, from one or several entities, are validated once
+    and share the same read-only mapping of state -> script config. The
+    Script objects, which hold the run state, stay per entity.
+    """
+
+    def __init__(self) -> None:
+        self._activities: dict[str, Mapping[str, list]] = {}
+        self._refs: Counter = Counter()
+
+    @callback
+    def async_acquire(self, name: str, states: dict) -> tuple[str, Mapping[str, list] | None]:
+        """
+        Return the key and validated scripts of an activity's states.
+
+        The scripts are None when the activity is invalid. A valid activity
+        must be released once not used anymore.
+        """
+        digest = config_hash(states)
+        if digest not in self._activities:
+            script_configs = {}
+            for k, v in states.items():
+                try:
+                    script_configs[str(k)] = SCRIPT_SCHEMA(v)
+                except vol.Invalid as err:
+                    _LOGGER.error(f"Activity {name}: {err}")
+                    return digest, None
+            self._activities[digest] = MappingProxyType(script_configs)
+
+        self._refs[digest] += 1
+        return digest, self._activities[digest]
+
+    @callback
+    def async_release(self, digest: str) -> None:
+        """Drop a reference to an activity, forgetting it when unused."""
+        self._refs[digest] -= 1
+        if self._refs[digest] <= 0:
+            del self._refs[digest]
+            self._activities.pop(digest, None)
+
+    @property
+    def stats(self) -> dict:
+        """Number of unique and total activity definitions in use."""
+        return {
+            "unique_activities": len(self._activities),
+            "total_activities": sum(self._refs.values()),
+        }
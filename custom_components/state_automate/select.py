@@ -1,26 +1,32 @@
 from __future__ import annotations
+import asyncio
+from collections import Counter
 import logging
 import re
+import time
 from homeassistant.util import slugify
 from homeassistant.helpers.reload import async_setup_reload_service
 
-import voluptuous as vol
-import homeassistant.helpers.config_validation as cv
-
 from homeassistant.components.select import SelectEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_NAME, CONF_ENTITY_ID, CONF_EVENT_DATA, DEVICE_DEFAULT_NAME
-from homeassistant.core import Event, HomeAssistant, State
+from homeassistant.core import Context, Event, HomeAssistant, State, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
 from homeassistant.helpers.script import SCRIPT_MODE_RESTART, Script
-from homeassistant.helpers.event import async_track_state_change
-
-from custom_components.state_automate.common import check_dict_is_contained_in_another, extract_state_from_event
+from homeassistant.helpers.start import async_at_start
 
-from .const import CONF_ACTIVITIES, CONF_EVENT_TYPE, CONF_EVENT_VALUE, CONF_STATES, DOMAIN, KEY_ENTER, KEY_LEAVE, PLATFORMS
+from custom_components.state_automate.common import compile_state_extractor, compile_state_map, config_hash
 
-SCRIPT_SCHEMA = vol.Schema(cv.SCRIPT_SCHEMA)
+from .action_queue import ActionQueue
+from .capture import KIND_RUN, KIND_SCRIPT, KIND_STATE, KIND_TRIGGER
+from .gestures import GestureEngine
+from .idempotence import SatisfiedCallsFilter
+from .state_table import StateTable
+from .stats import STAGE_EXTRACTED, STAGE_LOOKUP, STAGE_MATCHED, LatencyStats, Trace
+from .transition import merge_service_calls, plan_transition
+from .const import ATTR_CODE, CONF_ACTIVITIES, CONF_COALESCE, CONF_COMMAND_GAP, CONF_DEVICES, CONF_DIFF_TRANSITIONS, CONF_EVENT_TYPE, CONF_EVENT_VALUE, CONF_GESTURE_WINDOW, CONF_HOLD_TIME, CONF_MERGE_CALLS, CONF_QUEUE_MODE, CONF_QUEUE_SIZE, CONF_RATE_LIMIT, CONF_SKIP_SATISFIED, CONF_STATE_MAP, CONF_STATE_PRESET, CONF_STATES, CONF_STATS, CONF_SUPERSEDE, CONF_TRANSITION, CONF_TRANSPORTS, DATA_CALL_TRACKER, DATA_CAPTURE, DATA_DISPATCHER, DATA_ENTITIES, DATA_SCHEDULER, DATA_SCRIPT_CACHE, DATA_STATE_ROUTER, DATA_TIMER_WHEEL, DEFAULT_GESTURE_WINDOW, DEFAULT_HOLD_TIME, DEFAULT_QUEUE_SIZE, DOMAIN, KEY_ENTER, KEY_LEAVE, PLATFORMS, QUEUE_MODE_RESTART, TRANSITION_PARALLEL, TRANSITION_SEQUENTIAL
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -51,10 +57,19 @@ async def async_setup_entry(
     if config_entry.entry_id not in hass.data[DOMAIN]:
         return
     config = hass.data[DOMAIN][config_entry.entry_id]
-    await async_setup_platform(hass, {}, async_add_entities, config)
+    entity = StateAutomateSelect(hass, current_option="idle", config=config)
+    hass.data[DATA_ENTITIES][config_entry.entry_id] = entity
+    async_add_entities([entity])
+
+
+EMPTY_TABLE = StateTable({})
+
 
+def _build_script(hass: HomeAssistant, script_data: list) -> Script:
+    return Script(hass, script_data, f"{DOMAIN} script", DOMAIN, script_mode=SCRIPT_MODE_RESTART)
 
-class StateAutomateSelect(SelectEntity):
+
+class StateAutomateSelect(SelectEntity, RestoreEntity):
     """Representation of a demo select entity."""
 
     _attr_should_poll = False
@@ -71,46 +86,100 @@ class StateAutomateSelect(SelectEntity):
         self._attr_current_option = current_option
         self._attr_icon = "mdi:remote"
 
-        activities = config[CONF_ACTIVITIES]
-        _LOGGER.debug(activities)
-
-        self._attr_options =  [o['name'] for o in activities] 
-
-        pattern = re.compile(fr"^{CONF_STATES}(| .+)$")
-        self._activity_dict = {}
-        for act in activities:
-            self._activity_dict[act['name']] = {}
-            for key in [key for key in act.keys() if pattern.match(key)]:
-                self._activity_dict[act['name']].update(act[key])
-
-        self._action_dict = {}
-
-        async def _state_publisher(entity_id: str, old_state: State, new_state: State):
-            _LOGGER.debug(f"New entity state {new_state.state}")
-            if new_state is None:
-                return      
-            if str(new_state.state) not in self._action_dict:
-                return
-
-            await self._action_dict[str(new_state.state)].async_run(context=self._context)
-
-        async def _event_publisher(event: Event):
+        # Scripts are validated and built once, in the background after HA
+        # started or on the first selection of the activity; switching
+        # activity only swaps the reference. A reload only rebuilds the
+        # changed activities.
+        self._activity_hashes = {}
+        self._activity_scripts = {}
+        self._activity_digests = {}
+        self._compiled_activities = {}
+        self._invalid_activities = set()
+        # (from, to) -> (leave, enter) scripts, for the switches with
+        # redundant calls removed. Other switches use the activity scripts.
+        self._transitions = {}
+        self._unchanged_activities = set()
+        self._warm_up_task = None
+        self._ready = False
+        self._added_at = None
+        self._load_activities(config[CONF_ACTIVITIES])
+
+        self._action_dict = EMPTY_TABLE
+        self._transition = config.get(CONF_TRANSITION, TRANSITION_SEQUENTIAL)
+        self._stats = LatencyStats() if config.get(CONF_STATS, False) else None
+        self._merge_calls = config.get(CONF_MERGE_CALLS, False)
+        self._satisfied_filter = None
+        self._skipped_calls = Counter()
+        if config.get(CONF_SKIP_SATISFIED, False):
+            self._satisfied_filter = SatisfiedCallsFilter(hass, self._build_script)
+        self._state_map = compile_state_map(
+            config.get(CONF_STATE_PRESET), config.get(CONF_STATE_MAP)
+        )
+        self._gestures = GestureEngine(
+            hass.data[DATA_TIMER_WHEEL],
+            config.get(CONF_GESTURE_WINDOW, DEFAULT_GESTURE_WINDOW),
+            config.get(CONF_HOLD_TIME, DEFAULT_HOLD_TIME),
+            self._async_put_state,
+        )
+        self._capture = hass.data[DATA_CAPTURE]
+        # Device lanes shared with the other entities, when a gap is set
+        self._command_gap = config.get(CONF_COMMAND_GAP)
+        self._supersede = config.get(CONF_SUPERSEDE, False)
+        self._transports = {
+            entity_id: transport
+            for transport, entity_ids in config.get(CONF_TRANSPORTS, {}).items()
+            for entity_id in entity_ids
+        }
+
+        @callback
+        def _state_publisher(new_state: State):
+            """Update state when the source entity state changes."""
+            if self._capture.active:
+                self._capture.async_record(KIND_TRIGGER, self.entity_id, new_state.state)
+            trace = None
+            if self._stats is not None:
+                trace = self._stats.trace(new_state.last_updated)
+                trace.mark(STAGE_MATCHED)
+            state = str(new_state.state)
+            state = self._state_map.get(state, state)
+            _LOGGER.debug(f"New entity state {state}")
+            self._async_queue_state(state, trace)
+
+        @callback
+        def _event_publisher(event: Event):
             """Update state when event is received."""
-            if check_dict_is_contained_in_another(self._event_data, event.data):
-                # Extract new state
-                new_state = extract_state_from_event(self._event_value, event.data)
-
-                # Apply custom state mapping
-                # if new_state in self._state_map:
-                #     new_state = self._state_map[new_state]
-
-                _LOGGER.debug(f"New event state {new_state}")
-                if str(new_state) not in self._action_dict:
-                    return
-
-                await self._action_dict[str(new_state)].async_run(context=self._context)
-
+            if self._capture.active:
+                self._capture.async_record(KIND_TRIGGER, self.entity_id, event.data)
+            trace = None
+            if self._stats is not None:
+                trace = self._stats.trace(event.time_fired)
+                trace.mark(STAGE_MATCHED)
+
+            # Extract new state, the dispatcher already matched event_data
+            new_state = self._extract_state(event.data)
+            if trace is not None:
+                trace.mark(STAGE_EXTRACTED)
+
+            # Apply custom state mapping
+            new_state = str(new_state)
+            new_state = self._state_map.get(new_state, new_state)
+
+            _LOGGER.debug(f"New event state {new_state}")
+            self._async_queue_state(new_state, trace)
+
+        self._state_publisher = _state_publisher
+        self._event_publisher = _event_publisher
         self._event_listener = None
+        self._queue = ActionQueue(
+            hass,
+            config.get(CONF_NAME, DOMAIN),
+            config.get(CONF_QUEUE_SIZE, DEFAULT_QUEUE_SIZE),
+            coalesce=config.get(CONF_COALESCE, True),
+            rate_limit=config.get(CONF_RATE_LIMIT, 0),
+            on_idle=self._async_queue_idle,
+            run_script=self._async_run_script,
+            mode=config.get(CONF_QUEUE_MODE, QUEUE_MODE_RESTART),
+        )
         if CONF_NAME in config:
             self._attr_unique_id = f'{DOMAIN}_{slugify(config[CONF_NAME])}_select'
             self._attr_name = config[CONF_NAME]
@@ -121,12 +190,268 @@ class StateAutomateSelect(SelectEntity):
             self._attr_unique_id = f'{DOMAIN}_{config[CONF_EVENT_TYPE]}_{config[CONF_EVENT_VALUE]}_select'
             self._attr_name = f'State Automate {config[CONF_EVENT_TYPE]}'
 
-        if CONF_ENTITY_ID in config:
-            async_track_state_change(hass, config[CONF_ENTITY_ID], _state_publisher)
-        else:
-            self._event_data = config[CONF_EVENT_DATA]
+        if CONF_ENTITY_ID not in config:
+            self._event_data = config.get(CONF_EVENT_DATA, {})
             self._event_value = config[CONF_EVENT_VALUE]
-            self._event_listener = self._hass.bus.async_listen(config[CONF_EVENT_TYPE], _event_publisher)
+            self._extract_state = compile_state_extractor(self._event_value)
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        """Return the action queue statistics."""
+        return {
+            "queue_depth": self._queue.depth,
+            "dropped": self._queue.dropped,
+            "coalesced": self._queue.coalesced,
+            "ready": self._ready,
+            **({"skipped_calls": dict(self._skipped_calls)} if self._satisfied_filter else {}),
+        }
+
+    @property
+    def latency_stats(self) -> dict | None:
+        """Return the hot path latency percentiles, None when disabled."""
+        if self._stats is None:
+            return None
+        return self._stats.as_dict()
+
+    @callback
+    def _async_queue_state(self, state: str, trace: Trace | None = None) -> None:
+        """Queue the scripts of a state and of its gestures."""
+        if self._capture.active:
+            self._capture.async_record(KIND_STATE, self.entity_id, state)
+        self._gestures.async_press(state, self._action_dict, trace)
+
+    @callback
+    def _async_put_state(self, key: str, state: str, trace: Trace | None = None) -> None:
+        """Queue the script of a state or gesture key, if the current activity has one."""
+        script = self._action_dict.match(key)
+        if self._capture.active:
+            self._capture.async_record(
+                KIND_SCRIPT, self.entity_id, key, self._attr_current_option, script is not None
+            )
+        if script is None:
+            return
+        if self._added_at is not None:
+            _LOGGER.debug(
+                f"{self.name}: first press handled "
+                f"{(time.monotonic() - self._added_at) * 1000:.1f} ms after setup"
+            )
+            self._added_at = None
+
+        context = self._context
+        if trace is not None:
+            trace.mark(STAGE_LOOKUP)
+            # A context of its own to spot the first service call of the run
+            context = Context(parent_id=self._context.id if self._context else None)
+            self._hass.data[DATA_CALL_TRACKER].async_track(context.id, trace)
+        self._queue.async_put(key, script, {ATTR_CODE: state}, context, trace)
+
+    @callback
+    def _async_queue_idle(self) -> None:
+        if self.hass is not None:
+            self.async_write_ha_state()
+
+    def _load_activities(self, activities: list) -> tuple[int, int]:
+        """
+        Load the activities, keeping the scripts of the unchanged ones.
+
+        The scripts of the new or changed activities are left to the warm up.
+        Return the number of activities reused and to rebuild.
+        """
+        _LOGGER.debug(activities)
+
+        pattern = re.compile(fr"^{CONF_STATES}(| .+)$")
+        activity_hashes = {}
+        activity_dict = {}
+        activity_devices = {}
+        activity_scripts = {}
+        compiled_activities = {}
+        invalid_activities = set()
+        unchanged = set()
+        for act in activities:
+            name = act['name']
+            activity_hashes[name] = config_hash(act)
+            activity_dict[name] = {}
+            activity_devices[name] = {
+                k: frozenset(v) for k, v in act.get(CONF_DEVICES, {}).items()
+            }
+            for key in [key for key in act.keys() if pattern.match(key)]:
+                activity_dict[name].update(act[key])
+
+            if self._activity_hashes.get(name) != activity_hashes[name]:
+                continue
+            unchanged.add(name)
+            if name in self._compiled_activities:
+                activity_scripts[name] = self._activity_scripts[name]
+                compiled_activities[name] = self._compiled_activities[name]
+            if name in self._invalid_activities:
+                invalid_activities.add(name)
+
+        script_cache = self._hass.data[DATA_SCRIPT_CACHE]
+        activity_digests = {}
+        for name, digest in self._activity_digests.items():
+            if name in compiled_activities:
+                activity_digests[name] = digest
+            else:
+                script_cache.async_release(digest)
+
+        self._attr_options = list(activity_dict)
+        self._activity_hashes = activity_hashes
+        self._activity_digests = activity_digests
+        self._activity_dict = activity_dict
+        self._activity_devices = activity_devices
+        self._activity_scripts = activity_scripts
+        self._compiled_activities = compiled_activities
+        self._invalid_activities = invalid_activities
+        self._unchanged_activities = unchanged
+        self._transitions = {
+            pair: scripts
+            for pair, scripts in self._transitions.items()
+            if pair[0] in unchanged and pair[1] in unchanged
+        }
+        self._ready = len(compiled_activities) + len(invalid_activities) == len(activity_dict)
+
+        return len(unchanged), len(activity_dict) - len(unchanged)
+
+    def _build_script(self, script_data: list) -> Script:
+        if self._merge_calls:
+            script_data = merge_service_calls(script_data)
+        return _build_script(self._hass, script_data)
+
+    @callback
+    def _async_activity_actions(self, name: str) -> StateTable:
+        """Return the scripts of an activity, building them if not done yet."""
+        if name in self._compiled_activities:
+            return self._compiled_activities[name]
+        if name not in self._activity_dict or name in self._invalid_activities:
+            return EMPTY_TABLE
+
+        digest, script_configs = self._hass.data[DATA_SCRIPT_CACHE].async_acquire(
+            name, self._activity_dict[name]
+        )
+        if script_configs is None:
+            self._invalid_activities.add(name)
+            return EMPTY_TABLE
+        self._activity_digests[name] = digest
+        self._activity_scripts[name] = script_configs
+        self._compiled_activities[name] = StateTable(
+            {k: self._build_script(v) for k, v in script_configs.items()}
+        )
+        return self._compiled_activities[name]
+
+    @callback
+    def _async_schedule_warm_up(self, _hass: HomeAssistant | None = None) -> None:
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+        self._warm_up_task = self._hass.async_create_task(self._async_warm_up())
+
+    async def _async_warm_up(self) -> None:
+        """Build the scripts of all activities, one at a time."""
+        start = time.monotonic()
+        for name in list(self._activity_dict):
+            self._async_activity_actions(name)
+            # Let the event loop serve remote presses in between
+            await asyncio.sleep(0)
+
+        if self._config.get(CONF_DIFF_TRANSITIONS, False):
+            self._transitions = self._plan_transitions(self._unchanged_activities)
+
+        self._ready = True
+        self._warm_up_task = None
+        _LOGGER.debug(
+            f"{self.name}: {len(self._compiled_activities)} activities ready in "
+            f"{(time.monotonic() - start) * 1000:.1f} ms"
+        )
+        self.async_write_ha_state()
+
+    @callback
+    def async_update_activities(self, activities: list) -> tuple[int, int]:
+        """Apply new activities to the running entity, keeping its option."""
+        reused, rebuilt = self._load_activities(activities)
+        self._config = {**self._config, CONF_ACTIVITIES: activities}
+        self._action_dict = self._async_activity_actions(self._attr_current_option)
+        if self.hass is not None:
+            self._async_schedule_warm_up()
+            self.async_write_ha_state()
+        return reused, rebuilt
+
+    def _plan_transitions(self, unchanged: set = frozenset()) -> dict:
+        """
+        Precompute the transition matrix between all activities.
+
+        Plans between two unchanged activities are kept from the previous
+        matrix, the pairs it has no plan for are planned again.
+        """
+        transitions = {}
+        for source, source_scripts in self._activity_scripts.items():
+            source_leave = source_scripts.get(KEY_LEAVE, [])
+            if not source_leave:
+                continue
+            for target, target_scripts in self._activity_scripts.items():
+                if target == source:
+                    continue
+                if (
+                    source in unchanged
+                    and target in unchanged
+                    and (source, target) in self._transitions
+                ):
+                    transitions[(source, target)] = self._transitions[(source, target)]
+                    continue
+                target_enter = target_scripts.get(KEY_ENTER, [])
+                leave, enter = plan_transition(
+                    source_scripts.get(KEY_ENTER, []), source_leave, target_enter
+                )
+                if len(leave) == len(source_leave) and len(enter) == len(target_enter):
+                    continue
+                transitions[(source, target)] = (
+                    self._build_script(leave) if leave else None,
+                    self._build_script(enter) if enter else None,
+                )
+        _LOGGER.debug(f"{len(transitions)} transitions with redundant calls removed")
+        return transitions
+
+    def _can_overlap_transition(self, old_option: str, option: str) -> bool:
+        """Tell if leave and enter declare devices, none of them in common."""
+        if self._transition != TRANSITION_PARALLEL:
+            return False
+        leave_devices = self._activity_devices.get(old_option, {}).get(KEY_LEAVE)
+        enter_devices = self._activity_devices.get(option, {}).get(KEY_ENTER)
+        if leave_devices is None or enter_devices is None:
+            return False
+        return leave_devices.isdisjoint(enter_devices)
+
+    @callback
+    def _async_skip_satisfied(self, activity: str, script: Script | None) -> Script | None:
+        """Drop the calls of a script whose targets are already set, if enabled."""
+        if self._satisfied_filter is None:
+            return script
+        script, skipped = self._satisfied_filter.async_filter(script)
+        if skipped:
+            self._skipped_calls[activity] += skipped
+            _LOGGER.debug(f"{self.name}: {activity}: skipped {skipped} calls")
+        return script
+
+    async def _async_run_script(
+        self, script: Script, variables: dict | None = None, context: Context | None = None
+    ) -> None:
+        """Run a script, through the device lanes when enabled."""
+        start = time.monotonic()
+        if self._command_gap is None:
+            await script.async_run(variables, context=context)
+        else:
+            await self._hass.data[DATA_SCHEDULER].async_run(
+                script,
+                lambda: script.async_run(variables, context=context),
+                self._transports,
+                self._command_gap,
+                self._supersede,
+            )
+        if self._capture.active:
+            self._capture.async_record(
+                KIND_RUN,
+                self.entity_id,
+                (variables or {}).get(ATTR_CODE, self._attr_current_option),
+                round((time.monotonic() - start) * 1000, 1),
+            )
 
     async def async_select_option(self, option: str) -> None:
         """Update the current selected option."""
@@ -134,40 +459,84 @@ class StateAutomateSelect(SelectEntity):
         if option == self._attr_current_option:
             return
 
-        if KEY_LEAVE in self._action_dict:
-            await self._action_dict[KEY_LEAVE].async_run(context=self._context)
+        # Presses queued or running for the previous activity are stale now
+        await self._queue.async_stop()
+        self._gestures.async_clear()
 
-        self._attr_current_option = option
-        self._action_dict = {}
-        for k, v in self._activity_dict[self._attr_current_option].items():
-            try:
-                script_data = SCRIPT_SCHEMA(v)
-            except vol.Invalid as err:
-                _LOGGER.error(err)
-                return
-            script_obj = Script(self._hass, script_data, f"{DOMAIN} script", DOMAIN, script_mode=SCRIPT_MODE_RESTART)
-            self._action_dict[str(k)] = script_obj
-
-        if KEY_ENTER in self._action_dict:
-            await self._action_dict[KEY_ENTER].async_run(context=self._context)
+        start = time.monotonic()
+        old_option = self._attr_current_option
+        leave_script = self._action_dict.get(KEY_LEAVE)
 
+        self._attr_current_option = option
+        self._action_dict = self._async_activity_actions(option)
+        enter_script = self._action_dict.get(KEY_ENTER)
+
+        if (old_option, option) in self._transitions:
+            leave_script, enter_script = self._transitions[(old_option, option)]
+
+        if self._can_overlap_transition(old_option, option):
+            leave_script = self._async_skip_satisfied(old_option, leave_script)
+            enter_script = self._async_skip_satisfied(option, enter_script)
+            await asyncio.gather(
+                *[
+                    self._async_run_script(script, context=self._context)
+                    for script in (leave_script, enter_script)
+                    if script is not None
+                ]
+            )
+            mode = TRANSITION_PARALLEL
+        else:
+            leave_script = self._async_skip_satisfied(old_option, leave_script)
+            if leave_script is not None:
+                await self._async_run_script(leave_script, context=self._context)
+            # Checked once leave is done, it may have changed the states
+            enter_script = self._async_skip_satisfied(option, enter_script)
+            if enter_script is not None:
+                await self._async_run_script(enter_script, context=self._context)
+            mode = TRANSITION_SEQUENTIAL
+
+        _LOGGER.debug(
+            f"{self.name}: {old_option} -> {option} in "
+            f"{(time.monotonic() - start) * 1000:.1f} ms ({mode})"
+        )
         _LOGGER.debug(self._action_dict)
 
         self.async_write_ha_state()
 
     async def async_added_to_hass(self) -> None:
-        if self._attr_current_option in self._activity_dict:
-            for k, v in self._activity_dict[self._attr_current_option].items():
-                try:
-                    script_data = SCRIPT_SCHEMA(v)
-                except vol.Invalid as err:
-                    _LOGGER.error(err)
-                    return
-                script_obj = Script(self._hass, script_data, f"{DOMAIN} script", DOMAIN)
-                self._action_dict[str(k)] = script_obj
+        self._added_at = time.monotonic()
+
+        # Back to the last activity, without running its enter script again
+        last_state = await self.async_get_last_state()
+        if last_state is not None and last_state.state in self._activity_dict:
+            self._attr_current_option = last_state.state
+            _LOGGER.debug(f"{self.name}: restored {last_state.state}")
+
+        self._action_dict = self._async_activity_actions(self._attr_current_option)
+        self.async_on_remove(async_at_start(self.hass, self._async_schedule_warm_up))
+
+        if CONF_ENTITY_ID in self._config:
+            self._event_listener = self._hass.data[DATA_STATE_ROUTER].async_register(
+                self._config[CONF_ENTITY_ID], self._state_publisher
+            )
+        else:
+            self._event_listener = self._hass.data[DATA_DISPATCHER].async_register(
+                self._config[CONF_EVENT_TYPE], self._event_data, self._event_publisher
+            )
 
     async def async_will_remove_from_hass(self):
         """Remove listeners when removing entity from Home Assistant."""
+        self._queue.async_cancel()
+        self._gestures.async_clear()
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+            self._warm_up_task = None
+        script_cache = self._hass.data[DATA_SCRIPT_CACHE]
+        for digest in self._activity_digests.values():
+            script_cache.async_release(digest)
+        self._activity_digests = {}
+        self._activity_scripts = {}
+        self._compiled_activities = {}
         if self._event_listener is not None:
             self._event_listener()
             self._event_listener = None
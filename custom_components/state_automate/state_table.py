@@ -0,0 +1,127 @@
+"""Lookup of the script of a state, by exact key, numeric range or pattern."""
+from __future__ import annotations
+
+from bisect import bisect_right
+import fnmatch
+import logging
+import re
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+# `1000..1006`, bounds included
+RANGE_KEY = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*\.\.\s*(-?\d+(?:\.\d+)?)\s*$")
+WILDCARD_CHARS = frozenset("*?[")
+# Backreferences would point at the wrong group once patterns are combined
+BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+def _pattern_of_key(key: str) -> str | None:
+    """Regex of a `/regex/` or wildcard state key, None for a plain key."""
+    if len(key) > 2 and key[0] == "/" and key[-1] == "/":
+        return key[1:-1]
+    if not WILDCARD_CHARS.isdisjoint(key):
+        return fnmatch.translate(key)
+    return None
+
+
+class StateTable:
+    """
+    Scripts of an activity, by state key.
+
+    Besides plain keys, a state key can be a numeric range (`1000..1006`),
+    a wildcard (`10?`, `10[0-9]`, `btn_*`) or a regex (`/10\\d/`).
+    A state is looked up by exact key first, whatever the key looks like, so
+    a state equal to a range or pattern key still gets its script; then in
+    the ranges, then against all the patterns at once. Patterns that cannot be combined into
+    one regex (backreferences, inline flags, duplicate group names) are tried
+    one after the other instead.
+    """
+
+    def __init__(self, scripts: dict[str, Any]) -> None:
+        self._keys = list(scripts)
+        self._exact = {}
+        intervals = []
+        patterns = []
+        for key, script in scripts.items():
+            if (match := RANGE_KEY.match(key)) is not None:
+                low, high = sorted((float(match[1]), float(match[2])))
+                intervals.append((low, high, script))
+                self._exact[key] = script
+                continue
+            pattern = _pattern_of_key(key)
+            if pattern is None:
+                self._exact[key] = script
+                continue
+            try:
+                regex = re.compile(pattern)
+            except re.error as err:
+                _LOGGER.error(f"Invalid state key {key}: {err}")
+                continue
+            patterns.append((pattern, regex, script))
+            self._exact[key] = script
+
+        intervals.sort(key=lambda interval: interval[0])
+        self._intervals = intervals
+        self._starts = [interval[0] for interval in intervals]
+
+        # One regex for all the patterns, its outer groups telling which matched
+        self._regex = None
+        self._group_scripts = {}
+        self._patterns = []
+        if patterns:
+            if any(BACKREFERENCE.search(pattern) for pattern, _, _ in patterns):
+                self._patterns = [(regex, script) for _, regex, script in patterns]
+            else:
+                try:
+                    self._regex = re.compile("|".join(f"({p})" for p, _, _ in patterns))
+                except re.error:
+                    self._patterns = [(regex, script) for _, regex, script in patterns]
+                else:
+                    index = 1
+                    for _, regex, script in patterns:
+                        self._group_scripts[index] = script
+                        index += 1 + regex.groups
+
+    def __repr__(self) -> str:
+        return f"StateTable({self._keys})"
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._exact
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Script of an exact state key."""
+        return self._exact.get(key, default)
+
+    def match(self, state: str) -> Any:
+        """Script handling a state, None if there is none."""
+        script = self._exact.get(state)
+        if script is not None:
+            return script
+
+        if self._intervals:
+            try:
+                value = float(state)
+            except ValueError:
+                pass
+            else:
+                index = bisect_right(self._starts, value) - 1
+                while index >= 0:
+                    low, high, script = self._intervals[index]
+                    if high >= value:
+                        return script
+                    index -= 1
+
+        if self._regex is not None:
+            match = self._regex.fullmatch(state)
+            if match is not None:
+                return self._group_scripts[match.lastindex]
+
+        for regex, script in self._patterns:
+            if regex.fullmatch(state) is not None:
+                return script
+
+        return None
@@ -0,0 +1,99 @@
+"""Hot path latency statistics of the state_automate entities."""
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from datetime import datetime
+import time
+
+from homeassistant.const import EVENT_CALL_SERVICE
+from homeassistant.core import Event, HomeAssistant, callback
+import homeassistant.util.dt as dt_util
+
+STAGE_MATCHED = "matched"
+STAGE_EXTRACTED = "extracted"
+STAGE_LOOKUP = "lookup"
+STAGE_RUN_START = "run_start"
+STAGE_FIRST_CALL = "first_call"
+STAGES = (STAGE_MATCHED, STAGE_EXTRACTED, STAGE_LOOKUP, STAGE_RUN_START, STAGE_FIRST_CALL)
+
+SAMPLES_SIZE = 256
+PENDING_CALLS_SIZE = 64
+
+
+def _percentile(values: list, pct: float) -> float:
+    """Nearest rank percentile of sorted values."""
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class Trace:
+    """Timings of one trigger, from the time it was fired."""
+
+    __slots__ = ("_stats", "_start")
+
+    def __init__(self, stats: LatencyStats, start: float) -> None:
+        self._stats = stats
+        self._start = start
+
+    def mark(self, stage: str) -> None:
+        self._stats.samples[stage].append(time.perf_counter() - self._start)
+
+
+class LatencyStats:
+    """Rolling latency samples of the hot path stages of one entity."""
+
+    def __init__(self, size: int = SAMPLES_SIZE) -> None:
+        self.samples = {stage: deque(maxlen=size) for stage in STAGES}
+
+    def trace(self, fired: datetime | None = None) -> Trace:
+        """Start timing a trigger fired at the given time (now by default)."""
+        start = time.perf_counter()
+        if fired is not None:
+            start -= (dt_util.utcnow() - fired).total_seconds()
+        return Trace(self, start)
+
+    def as_dict(self) -> dict:
+        """Percentiles of each stage, in ms since the trigger was fired."""
+        ret = {}
+        for stage, samples in self.samples.items():
+            values = sorted(samples)
+            if not values:
+                ret[stage] = {"count": 0}
+                continue
+            ret[stage] = {
+                "count": len(values),
+                "p50": round(_percentile(values, 50) * 1000, 2),
+                "p95": round(_percentile(values, 95) * 1000, 2),
+                "p99": round(_percentile(values, 99) * 1000, 2),
+            }
+        return ret
+
+
+class ServiceCallTracker:
+    """Mark the first service call made by a traced script run."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+        self._pending: OrderedDict[str, Trace] = OrderedDict()
+        self._unsub = None
+
+    @callback
+    def async_track(self, context_id: str, trace: Trace) -> None:
+        """Wait for the first service call made with the given context."""
+        if self._unsub is None:
+            self._unsub = self._hass.bus.async_listen(
+                EVENT_CALL_SERVICE, self._async_service_called
+            )
+        self._pending[context_id] = trace
+        # Runs calling no service at all are forgotten eventually
+        if len(self._pending) > PENDING_CALLS_SIZE:
+            self._pending.popitem(last=False)
+
+    @callback
+    def _async_service_called(self, event: Event) -> None:
+        if not self._pending or event.context is None:
+            return
+        trace = self._pending.pop(event.context.id, None)
+        if trace is None and event.context.parent_id is not None:
+            trace = self._pending.pop(event.context.parent_id, None)
+        if trace is not None:
+            trace.mark(STAGE_FIRST_CALL)
@@ -0,0 +1,220 @@
+"""Plan the leave/enter scripts run when switching between two activities."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.helpers.template import Template
+
+POWER_SERVICES = {"turn_on": "turn_off", "turn_off": "turn_on"}
+# Step options that change what a service call does
+CALL_OPTIONS = ("data_template", "enabled", "continue_on_error")
+# Actions that make no service call
+INERT_ACTIONS = frozenset(("delay", "wait_template", "wait_for_trigger", "variables", "event"))
+# Actions that may end the script, the steps after them are not sure to run
+ENDING_ACTIONS = frozenset(("condition", "stop"))
+
+
+class _Dynamic(Exception):
+    """The step depends on a template, it cannot be compared."""
+
+
+def _freeze(value: Any):
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, Template):
+        if not value.is_static:
+            raise _Dynamic
+        return value.template
+    hash(value)
+    return value
+
+
+def service_call_key(step: dict) -> tuple | None:
+    """
+    Identify a static service call step by (domain, service, target, data, options).
+
+    Return None for anything else (conditions, delays, templates, ...).
+    """
+    service = step.get("service")
+    if not isinstance(service, str) or "." not in service:
+        return None
+    domain, service = service.split(".", maxsplit=1)
+
+    target = dict(step.get("target", {}))
+    if "entity_id" in step:
+        target["entity_id"] = step["entity_id"]
+    options = {k: step[k] for k in CALL_OPTIONS if k in step}
+    try:
+        return (
+            domain,
+            service,
+            _freeze(target),
+            _freeze(step.get("data", {})),
+            _freeze(options),
+        )
+    except (_Dynamic, TypeError):
+        return None
+
+
+def _touched_entities(step: dict) -> frozenset | None:
+    """Entity ids a step may act on, None when they cannot be told."""
+    if "service" not in step:
+        return frozenset() if INERT_ACTIONS.intersection(step) else None
+    target = dict(step.get("target", {}))
+    if "entity_id" in step:
+        target["entity_id"] = step["entity_id"]
+    if set(target) != {"entity_id"}:
+        return None
+    entity_ids = target["entity_id"]
+    if isinstance(entity_ids, str):
+        entity_ids = [entity_ids]
+    if not isinstance(entity_ids, list) or not all(isinstance(e, str) for e in entity_ids):
+        return None
+    return frozenset(entity_ids)
+
+
+def _alone(touched: list, index: int, others: range) -> bool:
+    """Tell if none of the other steps may act on the entities of a step."""
+    entities = touched[index]
+    if entities is None:
+        return False
+    return all(
+        touched[i] is not None and touched[i].isdisjoint(entities) for i in others
+    )
+
+
+def _sure_to_run(sequence: list) -> int:
+    """Number of leading steps of a script that run whatever happens."""
+    for index, step in enumerate(sequence):
+        if ENDING_ACTIONS.intersection(step):
+            return index
+    return len(sequence)
+
+
+def _is_inverse(key: tuple, other: tuple) -> bool:
+    return (
+        key[0] == other[0]
+        and POWER_SERVICES.get(key[1]) == other[1]
+        and key[2:] == other[2:]
+    )
+
+
+def plan_transition(
+    source_enter: list, source_leave: list, target_enter: list
+) -> tuple[list, list]:
+    """
+    Drop the redundant service calls between two activities.
+
+    * A `target_enter` call already made by `source_leave` is dropped.
+    * A `source_leave` turn_off cancelled by a `target_enter` turn_on of the
+      same target and data is dropped with it, when `source_enter` made that
+      same turn_on call (the device is already on).
+
+    Only the last calls acting on their entities in `source_enter` and
+    `source_leave`, and the first one in `target_enter`, are considered: any
+    other step acting on them in between could undo or depend on them. A
+    dropped turn_off must be the only `source_leave` step acting on its
+    entities. Calls of `source_enter` and `source_leave` after a condition or
+    a stop, which may end the script before them, are not relied on.
+
+    Return the (leave, enter) step lists to run.
+    """
+    enter_on = [_touched_entities(step) for step in source_enter]
+    enter_end = _sure_to_run(source_enter)
+    already_on = {
+        key
+        for i, key in enumerate(map(service_call_key, source_enter[:enter_end]))
+        if key and _alone(enter_on, i, range(i + 1, len(source_enter)))
+    }
+    leave_end = _sure_to_run(source_leave)
+    leave_keys = [
+        service_call_key(step) if i < leave_end else None
+        for i, step in enumerate(source_leave)
+    ]
+    leave_touched = [_touched_entities(step) for step in source_leave]
+    enter_touched = [_touched_entities(step) for step in target_enter]
+
+    drop_leave = set()
+    drop_enter = set()
+    for j, step in enumerate(target_enter):
+        key = service_call_key(step)
+        if key is None or not _alone(enter_touched, j, range(j)):
+            continue
+        for i, leave_key in enumerate(leave_keys):
+            if leave_key is None or i in drop_leave:
+                continue
+            if not _alone(leave_touched, i, range(i + 1, len(source_leave))):
+                continue
+            if leave_key == key:
+                drop_enter.add(j)
+                break
+            if (
+                _is_inverse(leave_key, key)
+                and key in already_on
+                and _alone(leave_touched, i, range(i))
+            ):
+                drop_leave.add(i)
+                drop_enter.add(j)
+                break
+
+    return (
+        [step for i, step in enumerate(source_leave) if i not in drop_leave],
+        [step for j, step in enumerate(target_enter) if j not in drop_enter],
+    )
+
+
+def _merge_key(step: dict) -> tuple | None:
+    """What two steps must share to be merged, None if never mergeable."""
+    if not isinstance(step.get("service"), str):
+        return None
+    target = dict(step.get("target", {}))
+    if "entity_id" in step:
+        target["entity_id"] = step["entity_id"]
+    if set(target) != {"entity_id"}:
+        return None
+    entity_ids = target["entity_id"]
+    if isinstance(entity_ids, str):
+        entity_ids = [entity_ids]
+    if not isinstance(entity_ids, list) or not all(isinstance(e, str) for e in entity_ids):
+        return None
+    others = {k: v for k, v in step.items() if k not in ("entity_id", "target")}
+    try:
+        return _freeze(others)
+    except (_Dynamic, TypeError):
+        return None
+
+
+def _entity_ids(step: dict) -> list:
+    entity_ids = step.get("target", {}).get("entity_id", step.get("entity_id"))
+    return [entity_ids] if isinstance(entity_ids, str) else list(entity_ids)
+
+
+def merge_service_calls(sequence: list) -> list:
+    """
+    Merge adjacent calls to the same service with the same data.
+
+    `light.turn_on` on five lights one after the other becomes one
+    `light.turn_on` targeting the five of them. Only static calls targeting
+    entity ids are merged, any other step in between keeps them apart. A call
+    targeting an entity already targeted by the calls it would merge with is
+    kept apart too: repeated commands to a device are all sent, in order.
+    """
+    merged = []
+    last_key = None
+    for step in sequence:
+        key = _merge_key(step)
+        if key is not None and key == last_key:
+            previous = merged[-1]
+            entity_ids = _entity_ids(previous)
+            step_entity_ids = _entity_ids(step)
+            if set(entity_ids).isdisjoint(step_entity_ids):
+                merged[-1] = {
+                    **{k: v for k, v in previous.items() if k != "entity_id"},
+                    "target": {"entity_id": entity_ids + step_entity_ids},
+                }
+                continue
+        merged.append(step)
+        last_key = key
+    return merged
@@ -0,0 +1 @@
+"""Tests for the state_automate integration."""
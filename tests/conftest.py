@@ -0,0 +1,83 @@
+"""Fixtures and helpers of the state_automate tests."""
+import pytest
+from homeassistant.core import HomeAssistant, State
+from homeassistant import bootstrap, loader
+from homeassistant.config_entries import ConfigEntries
+
+from custom_components.state_automate import _async_setup_data
+from custom_components.state_automate.const import DOMAIN
+
+
+def service_call(service: str, entity_id, **data) -> dict:
+    """A service call step targeting entity ids."""
+    step = {"service": service, "target": {"entity_id": entity_id}}
+    if data:
+        step["data"] = data
+    return step
+
+
+def remotes_config(remotes: int, activities: int) -> dict:
+    """A `state_automate` block of state remotes, each activity toggling a switch per key."""
+    return {
+        DOMAIN: [
+            {
+                "entity_id": f"sensor.remote_{remote}",
+                "name": f"Remote {remote}",
+                "activities": [
+                    {
+                        "name": f"Activity {activity}",
+                        "states": {
+                            key: [service_call("switch.toggle", f"switch.remote_{remote}_{index}")]
+                            for index, key in enumerate(("on", "off", "brightness_up"))
+                        },
+                    }
+                    for activity in range(activities)
+                ],
+            }
+            for remote in range(remotes)
+        ]
+    }
+
+
+class FakeStates:
+    """State machine holding fixed states."""
+
+    def __init__(self, *states: State) -> None:
+        self._states = {state.entity_id: state for state in states}
+
+    def get(self, entity_id: str) -> State | None:
+        return self._states.get(entity_id)
+
+
+class FakeHass:
+    """Home Assistant reduced to its state machine."""
+
+    def __init__(self, *states: State) -> None:
+        self.states = FakeStates(*states)
+
+
+class FakeScript:
+    """Script reduced to its sequence."""
+
+    def __init__(self, sequence: list) -> None:
+        self.sequence = sequence
+
+
+@pytest.fixture
+async def hass(tmp_path):
+    """A running Home Assistant, with the state_automate helpers set up."""
+    hass = HomeAssistant(str(tmp_path))
+    hass.config.skip_pip = True
+    loader.async_setup(hass)
+    await hass.async_start()
+    _async_setup_data(hass)
+    yield hass
+    await hass.async_stop(force=True)
+
+
+@pytest.fixture
+async def hass_with_entries(hass):
+    """The running Home Assistant, with its registries and config entries."""
+    hass.config_entries = ConfigEntries(hass, {})
+    await bootstrap.async_load_base_functionality(hass)
+    return hass
@@ -0,0 +1,65 @@
+"""Tests of the state script queue."""
+import asyncio
+
+from homeassistant.core import callback
+from homeassistant.helpers.script import SCRIPT_MODE_RESTART, Script
+
+from custom_components.state_automate.action_queue import ActionQueue
+from custom_components.state_automate.const import DOMAIN, QUEUE_MODE_QUEUED
+
+
+def _script(hass, key: str, delay: float = 0) -> Script:
+    sequence = [{"event": "test_run", "event_data": {"key": key}}]
+    if delay:
+        sequence.append({"delay": delay})
+    sequence.append({"event": "test_done", "event_data": {"key": key}})
+    return Script(hass, sequence, key, DOMAIN, script_mode=SCRIPT_MODE_RESTART)
+
+
+def _listen(hass, event_type: str) -> list:
+    keys = []
+
+    @callback
+    def _record(event):
+        keys.append(event.data["key"])
+
+    hass.bus.async_listen(event_type, _record)
+    return keys
+
+
+async def test_restart_mode_runs_keys_concurrently(hass):
+    runs, done = _listen(hass, "test_run"), _listen(hass, "test_done")
+    queue = ActionQueue(hass, "remote", max_size=10)
+    slow = _script(hass, "a", delay=60)
+
+    queue.async_put("a", slow, None, None)
+    await asyncio.sleep(0.05)
+    queue.async_put("b", _script(hass, "b"), None, None)
+    await asyncio.sleep(0.05)
+    assert done == ["b"]
+
+    # Pressed again while running, the script of a restarts
+    queue.async_put("a", slow, None, None)
+    await asyncio.sleep(0.05)
+    assert runs == ["a", "b", "a"]
+    assert slow.runs == 1
+
+    await queue.async_stop()
+    assert not slow.is_running
+    assert done == ["b"]
+
+
+async def test_queued_mode_runs_one_at_a_time(hass):
+    done = _listen(hass, "test_done")
+    queue = ActionQueue(hass, "remote", max_size=10, mode=QUEUE_MODE_QUEUED)
+    slow = _script(hass, "a", delay=60)
+
+    queue.async_put("a", slow, None, None)
+    queue.async_put("b", _script(hass, "b"), None, None)
+    await asyncio.sleep(0.05)
+    assert queue.depth == 1
+    assert done == []
+
+    await queue.async_stop()
+    assert not slow.is_running
+    assert queue.depth == 0
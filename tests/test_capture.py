@@ -0,0 +1,31 @@
+"""Tests of the traffic capture services."""
+from homeassistant.config_entries import ConfigEntries
+
+from custom_components.state_automate import async_setup
+from custom_components.state_automate.const import DATA_CAPTURE, DOMAIN
+
+
+async def _setup(hass) -> None:
+    hass.config_entries = ConfigEntries(hass, {})
+    await async_setup(hass, {DOMAIN: []})
+
+
+async def test_capture_path_outside_allowed_dirs_is_rejected(hass):
+    await _setup(hass)
+    await hass.services.async_call(
+        DOMAIN, "capture_start", {"path": "/etc/state_automate.bin"}, blocking=True
+    )
+    assert not hass.data[DATA_CAPTURE].active
+
+
+async def test_relative_capture_path_is_under_config_dir(hass, tmp_path):
+    (tmp_path / "www").mkdir()
+    hass.config.allowlist_external_dirs = {str(tmp_path / "www")}
+    await _setup(hass)
+    await hass.services.async_call(
+        DOMAIN, "capture_start", {"path": "www/capture.bin"}, blocking=True
+    )
+    capture = hass.data[DATA_CAPTURE]
+    assert capture.active
+    assert capture.stats["path"] == str(tmp_path / "www" / "capture.bin")
+    await capture.async_stop()
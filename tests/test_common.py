@@ -0,0 +1,106 @@
+"""Tests of the configuration and event helpers."""
+import random
+
+from custom_components.state_automate.common import (
+    compile_event_filter,
+    make_string_ui_from_dict,
+    parse_dict_from_ui_string,
+)
+
+VALUES = ["on", "off", "1002", "up"]
+
+
+def _reference_check(filter_data: dict, data: dict) -> bool:
+    """The filter semantics, checked key by key on every call."""
+    for key, value in filter_data.items():
+        accepted = [v.strip() for v in value.split("|")]
+        if key in data:
+            if data[key] not in accepted:
+                return False
+            continue
+        if "." not in key:
+            return False
+        head, rest = key.split(".", 1)
+        if not isinstance(data.get(head), dict) or not _reference_check({rest: value}, data[head]):
+            return False
+    return True
+
+
+def _random_filter(rng: random.Random) -> dict:
+    keys = ["command", "id", "params.mode", "params.step.size", "args", "a.b"]
+    filter_data = {}
+    for key in rng.sample(keys, rng.randint(1, 3)):
+        values = rng.sample(VALUES, rng.randint(1, 2))
+        filter_data[key] = " | ".join(values) if rng.random() < 0.5 else values[0]
+    return filter_data
+
+
+def _random_data(rng: random.Random, depth: int = 0) -> dict:
+    data = {}
+    for key in rng.sample(["command", "id", "params", "step", "mode", "size", "a.b", "args"], 4):
+        roll = rng.random()
+        if roll < 0.3 and depth < 2:
+            data[key] = _random_data(rng, depth + 1)
+        elif roll < 0.4:
+            data[key] = 1002
+        else:
+            data[key] = rng.choice(VALUES)
+    return data
+
+
+def test_compiled_filter_matches_the_reference_check():
+    rng = random.Random(3)
+    for _ in range(5000):
+        filter_data = _random_filter(rng)
+        data = _random_data(rng)
+        assert compile_event_filter(filter_data)(data) == _reference_check(filter_data, data), (
+            filter_data,
+            data,
+        )
+
+
+def test_filter_alternatives_and_nested_keys():
+    event = {"device_ieee": "00:01", "command": "off", "params": {"step_mode": "up"}}
+    assert compile_event_filter({"command": "on | off"})(event)
+    assert compile_event_filter({"params.step_mode": "down|up"})(event)
+    assert not compile_event_filter({"params.step_mode.x": "up"})(event)
+    assert not compile_event_filter({"device_ieee": "00:02"})(event)
+
+
+def _random_ui_dict(rng: random.Random, depth: int = 0, plain: bool = False) -> dict:
+    words = ["on", "off", "remote_1", "1002", "step up"]
+    if not plain:
+        words += ["00:15:8d:00:02:5a:3b:1c", "red, green", "a:b, c"]
+    data = {}
+    for index in range(rng.randint(1, 4)):
+        if depth < 4 and rng.random() < 0.3:
+            data[f"key_{depth}_{index}"] = _random_ui_dict(rng, depth + 1, plain)
+        else:
+            data[f"key_{depth}_{index}"] = rng.choice(words)
+    return data
+
+
+def test_ui_string_round_trips():
+    rng = random.Random(7)
+    for _ in range(2000):
+        data = _random_ui_dict(rng)
+        assert parse_dict_from_ui_string(make_string_ui_from_dict(data)) == data
+
+
+def test_ui_string_ignores_spaces_around_delimiters():
+    rng = random.Random(11)
+    for _ in range(2000):
+        data = _random_ui_dict(rng, plain=True)
+        text = "".join(
+            f"{' ' * rng.randint(0, 2)}{char}{' ' * rng.randint(0, 2)}" if char in "{}:," else char
+            for char in make_string_ui_from_dict(data)
+        )
+        assert parse_dict_from_ui_string(text) == data, text
+
+
+def test_ui_string_skips_empty_segments():
+    assert parse_dict_from_ui_string("a: b, , c: d") == {"a": "b", "c": "d"}
+    assert parse_dict_from_ui_string("a: b,, c: {d: e, , f: g}, ") == {
+        "a": "b",
+        "c": {"d": "e", "f": "g"},
+    }
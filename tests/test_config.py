@@ -0,0 +1,89 @@
+"""Tests of the YAML configuration processing."""
+import json
+
+import pytest
+import voluptuous as vol
+import yaml
+
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util.yaml import load_yaml
+
+from custom_components.state_automate import CONFIG_SCHEMA, _normalize
+from custom_components.state_automate import config as config_module
+from custom_components.state_automate.const import DOMAIN
+
+from .conftest import remotes_config, service_call
+
+
+def test_normalize_matches_the_json_round_trip(tmp_path):
+    config = remotes_config(2, 2)
+    config[DOMAIN].append(
+        {
+            "event_type": "deconz_event",
+            "event_value": "event",
+            "event_data": {"unique_id": "00:15:8d:00:02:00:00:01-01-1000"},
+            "name": "Dimmer",
+            "activities": [
+                {"name": "TV", "states": {1002: [service_call("switch.toggle", "switch.tv")]}}
+            ],
+        }
+    )
+    path = tmp_path / "configuration.yaml"
+    path.write_text(yaml.safe_dump(config))
+    validated = CONFIG_SCHEMA(load_yaml(str(path)))[DOMAIN]
+    assert _normalize(validated) == json.loads(json.dumps(validated))
+
+
+def test_normalize_shares_plain_subtrees():
+    config = {"name": "Remote", "activities": [{"name": "TV", "devices": {"enter": ["tv"]}}]}
+    assert _normalize(config) is config
+    config = {1: "a", "b": {"c": [1, 2]}}
+    normalized = _normalize(config)
+    assert normalized == {"1": "a", "b": {"c": [1, 2]}}
+    assert normalized["b"] is config["b"]
+
+
+def test_normalize_keeps_script_variables():
+    sequence = [
+        {"variables": {"level": "{{ 10 * 2 }}", "step": 2}},
+        {"condition": "time", "after": "07:00"},
+        {"delay": {"seconds": 2}},
+    ]
+    normalized = _normalize(cv.SCRIPT_SCHEMA(sequence))
+    assert normalized == [
+        {"variables": {"level": "{{ 10 * 2 }}", "step": 2}},
+        {"condition": "time", "after": "07:00:00"},
+        {"delay": 2.0},
+    ]
+    # The normalized sequence validates again to the same script
+    assert _normalize(cv.SCRIPT_SCHEMA(normalized)) == normalized
+
+
+def test_normalize_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        _normalize({"name": object()})
+
+
+async def test_unchanged_configuration_is_not_validated_again(hass, monkeypatch):
+    calls = []
+
+    def _schema(config):
+        calls.append(config)
+        return CONFIG_SCHEMA(config)
+
+    monkeypatch.setattr(config_module, "CONFIG_SCHEMA", _schema)
+    config = remotes_config(2, 2)
+    validated = await config_module.async_validate_config(hass, config)
+    assert len(calls) == 1
+
+    restored = await config_module.async_validate_config(hass, config)
+    assert len(calls) == 1
+    assert restored[DOMAIN] == _normalize(validated[DOMAIN])
+
+    config[DOMAIN][0]["name"] = "Renamed"
+    await config_module.async_validate_config(hass, config)
+    assert len(calls) == 2
+
+    config[DOMAIN][0]["activities"] = "invalid"
+    with pytest.raises(vol.Invalid):
+        await config_module.async_validate_config(hass, config)
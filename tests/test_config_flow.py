@@ -0,0 +1,57 @@
+"""Tests of the options flow."""
+from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntry
+from homeassistant.data_entry_flow import FlowResultType
+
+from custom_components.state_automate.config_flow import StateAutomateOptionsFlowHandler
+from custom_components.state_automate.const import DOMAIN
+
+
+def _entry(data: dict, options: dict | None = None) -> ConfigEntry:
+    return ConfigEntry(
+        version=1,
+        minor_version=1,
+        domain=DOMAIN,
+        title="Remote",
+        data=data,
+        source=SOURCE_IMPORT,
+        options=options,
+    )
+
+
+async def test_options_edit_the_event_filter_as_a_string(hass):
+    entry = _entry(
+        {
+            "event_type": "deconz_event",
+            "event_value": "event",
+            "event_data": {"id": "remote", "params": {"mode": "up | down"}},
+            "activities": [],
+        }
+    )
+    flow = StateAutomateOptionsFlowHandler(entry)
+    flow.hass = hass
+
+    result = await flow.async_step_init()
+    assert result["type"] == FlowResultType.FORM
+    defaults = {key.schema: key.default() for key in result["data_schema"].schema}
+    assert defaults == {"event_data": "id: remote, params: {mode: up | down}", "state_map": ""}
+
+    result = await flow.async_step_init(
+        {"event_data": "id: remote, , device: 12, params: {mode: up}", "state_map": "1002: power"}
+    )
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert result["data"] == {
+        "event_data": {"id": "remote", "device": 12, "params": {"mode": "up"}},
+        "state_map": {"1002": "power"},
+    }
+
+
+async def test_state_entities_only_have_a_state_map_option(hass):
+    entry = _entry(
+        {"entity_id": "sensor.remote", "activities": []}, {"state_map": {"1": "on"}}
+    )
+    flow = StateAutomateOptionsFlowHandler(entry)
+    flow.hass = hass
+
+    result = await flow.async_step_init()
+    defaults = {key.schema: key.default() for key in result["data_schema"].schema}
+    assert defaults == {"state_map": "1: on"}
@@ -0,0 +1,81 @@
+"""Tests of the routing of events and state changes to the entities."""
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import Event
+
+from custom_components.state_automate.dispatcher import EventDispatcher, StateRouter
+
+
+async def test_state_changes_are_routed_per_entity_id(hass):
+    router = StateRouter(hass)
+    received = []
+    router.async_register("sensor.a", lambda state: received.append(("a", state.state)))
+    router.async_register("sensor.b", lambda state: received.append(("b", state.state)))
+
+    hass.states.async_set("sensor.a", "1")
+    hass.states.async_set("sensor.a", "1", {"battery": 50})
+    hass.states.async_set("sensor.b", "2")
+    hass.states.async_set("sensor.c", "3")
+    await hass.async_block_till_done()
+    assert received == [("a", "1"), ("b", "2")]
+
+
+async def test_unregistered_target_is_not_called(hass):
+    router = StateRouter(hass)
+    received = []
+    unregister = router.async_register("sensor.a", received.append)
+    router.async_register("sensor.a", lambda state: None)
+    unregister()
+
+    hass.states.async_set("sensor.a", "1")
+    await hass.async_block_till_done()
+    assert received == []
+
+
+async def test_reload_soak_leaves_no_listener(hass):
+    """Entities registering and leaving over many reloads leak no listener."""
+    baseline = hass.bus.async_listeners().get(EVENT_STATE_CHANGED, 0)
+    router = StateRouter(hass)
+    received = []
+    for cycle in range(200):
+        unregisters = [
+            router.async_register(f"sensor.remote_{i}", received.append)
+            for i in range(50)
+        ]
+        hass.states.async_set("sensor.remote_0", str(cycle))
+        await hass.async_block_till_done()
+        for unregister in unregisters:
+            unregister()
+
+    assert len(received) == 200
+    assert not router._targets
+    assert not router._unsubs
+    assert hass.bus.async_listeners().get(EVENT_STATE_CHANGED, 0) == baseline
+
+
+async def test_events_reach_only_the_matching_entities(hass):
+    dispatcher = EventDispatcher(hass)
+    received = []
+    for index in range(500):
+        dispatcher.async_register(
+            "zha_event",
+            {"device_ieee": f"00:{index:03d}", "command": "on | off"},
+            lambda event, index=index: received.append(index),
+        )
+
+    hass.bus.async_fire("zha_event", {"device_ieee": "00:042", "command": "off"})
+    hass.bus.async_fire("zha_event", {"device_ieee": "00:042", "command": "move"})
+    hass.bus.async_fire("zha_event", {"device_ieee": "ff:042", "command": "on"})
+    await hass.async_block_till_done()
+    assert received == [42]
+
+
+
+async def test_event_filter_takes_an_event_or_its_data(hass):
+    dispatcher = EventDispatcher(hass)
+    dispatcher.async_register("zha_event", {"device_ieee": "00:042"}, lambda event: None)
+    route = dispatcher._routes["zha_event"]
+
+    data = {"device_ieee": "00:042", "command": "on"}
+    assert route._async_filter_event(Event("zha_event", data))
+    assert route._async_filter_event(data)
+    assert not route._async_filter_event({"device_ieee": "ff:042"})
@@ -0,0 +1,12 @@
+"""Smoke test of the benchmark harness, so that it keeps running."""
+from benchmarks.harness import KINDS, async_run, synthetic_config
+
+
+async def test_harness_replays_every_kind():
+    for kind in KINDS:
+        results = await async_run(
+            synthetic_config(3, 2, kind), events=200, match_ratio=0.5, memory=False
+        )
+        assert results["entities"] == 3
+        assert results["events"] >= 200
+        assert results["first_call_ms"]["count"]
@@ -0,0 +1,66 @@
+"""Tests of the skipping of service calls already satisfied."""
+from homeassistant.core import State
+
+from custom_components.state_automate.idempotence import SatisfiedCallsFilter
+
+from .conftest import FakeHass, FakeScript, service_call
+
+
+def _filter(*states: State) -> SatisfiedCallsFilter:
+    return SatisfiedCallsFilter(FakeHass(*states), FakeScript)
+
+
+def test_satisfied_call_is_skipped():
+    script = FakeScript(
+        [service_call("switch.turn_on", "switch.amp"), service_call("switch.turn_on", "switch.tv")]
+    )
+    filtered, skipped = _filter(
+        State("switch.amp", "on"), State("switch.tv", "off")
+    ).async_filter(script)
+    assert skipped == 1
+    assert filtered.sequence == [service_call("switch.turn_on", "switch.tv")]
+
+
+def test_all_satisfied_runs_nothing():
+    script = FakeScript([service_call("switch.turn_on", "switch.amp")])
+    assert _filter(State("switch.amp", "on")).async_filter(script) == (None, 1)
+
+
+def test_step_after_a_kept_step_on_the_same_entity_is_kept():
+    script = FakeScript(
+        [
+            service_call("switch.turn_off", "switch.amp"),
+            service_call("switch.turn_on", "switch.amp"),
+        ]
+    )
+    filtered, skipped = _filter(State("switch.amp", "on")).async_filter(script)
+    assert skipped == 0
+    assert filtered is script
+
+
+def test_nothing_is_skipped_after_a_delay():
+    script = FakeScript(
+        [
+            service_call("switch.turn_off", "switch.amp"),
+            {"delay": {"seconds": 1}},
+            service_call("switch.turn_on", "switch.tv"),
+        ]
+    )
+    filtered, skipped = _filter(
+        State("switch.amp", "on"), State("switch.tv", "on")
+    ).async_filter(script)
+    assert skipped == 0
+    assert filtered is script
+
+
+def test_power_cycle_with_delay_is_kept_whole():
+    script = FakeScript(
+        [
+            service_call("switch.turn_off", "switch.amp"),
+            {"delay": {"seconds": 1}},
+            service_call("switch.turn_on", "switch.amp"),
+        ]
+    )
+    filtered, skipped = _filter(State("switch.amp", "on")).async_filter(script)
+    assert skipped == 0
+    assert filtered is script
@@ -0,0 +1,31 @@
+"""Tests of the setup and reload of the YAML entries."""
+import yaml
+
+from homeassistant.setup import async_setup_component
+
+from custom_components.state_automate.const import CONF_ACTIVITIES, DATA_ENTITIES, DOMAIN
+
+from .conftest import remotes_config
+
+
+async def test_reload_updates_the_entries_in_place(hass_with_entries, tmp_path):
+    hass = hass_with_entries
+    config = remotes_config(5, 2)
+    (tmp_path / "configuration.yaml").write_text(yaml.safe_dump(config))
+    assert await async_setup_component(hass, DOMAIN, config)
+    await hass.async_block_till_done()
+    assert len(hass.config_entries.async_entries(DOMAIN)) == 5
+    entities = dict(hass.data[DATA_ENTITIES])
+    assert len(entities) == 5
+
+    config[DOMAIN][0][CONF_ACTIVITIES][0]["states"]["on"][0]["service"] = "switch.turn_on"
+    (tmp_path / "configuration.yaml").write_text(yaml.safe_dump(config))
+    await hass.services.async_call(DOMAIN, "reload", blocking=True)
+    await hass.async_block_till_done()
+
+    assert hass.data[DATA_ENTITIES] == entities
+    (entry,) = [
+        entry for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.title == "Remote 0"
+    ]
+    assert entry.data[CONF_ACTIVITIES][0]["states"]["on"][0]["service"] == "switch.turn_on"
@@ -0,0 +1,43 @@
+"""Tests of the state_automate select entity."""
+from custom_components.state_automate.select import StateAutomateSelect
+
+from .conftest import service_call
+
+
+def _config(**options) -> dict:
+    return {
+        "name": "Remote",
+        "entity_id": "sensor.remote",
+        "activities": [
+            {
+                "name": "TV",
+                "states": {
+                    "enter": [service_call("switch.turn_on", "switch.amp")],
+                    "leave": [service_call("switch.turn_off", "switch.amp")],
+                },
+            },
+            {
+                "name": "Radio",
+                "states": {
+                    "enter": [service_call("switch.turn_on", "switch.amp")],
+                    "leave": [service_call("switch.turn_off", "switch.amp")],
+                },
+            },
+        ],
+        **options,
+    }
+
+
+async def test_unchanged_pairs_without_plan_are_planned(hass):
+    config = _config(diff_transitions=True)
+    entity = StateAutomateSelect(hass, config, None)
+    entity.hass = hass
+    entity.entity_id = "select.remote"
+    await entity._async_warm_up()
+    assert ("TV", "Radio") in entity._transitions
+
+    # A reload before the warm up planned anything
+    entity._transitions = {}
+    entity.async_update_activities(config["activities"])
+    await entity._async_warm_up()
+    assert set(entity._transitions) == {("TV", "Radio"), ("Radio", "TV")}
@@ -0,0 +1,63 @@
+"""Tests of the state key lookup table."""
+from custom_components.state_automate.state_table import StateTable
+
+
+def test_exact_key_first():
+    table = StateTable({"105": "exact", "10?": "wildcard", "100..110": "range"})
+    assert table.match("105") == "exact"
+    assert table.match("106") == "range"
+    assert table.match("10a") == "wildcard"
+    assert table.match("99") is None
+
+
+def test_range_bounds_are_included():
+    table = StateTable({"1000..1006": "range", "-5..-1": "negative"})
+    assert table.match("1000") == "range"
+    assert table.match("1006") == "range"
+    assert table.match("1007") is None
+    assert table.match("-3") == "negative"
+
+
+def test_combined_patterns():
+    table = StateTable({"/btn_(\\d+)/": "regex", "key_*": "wildcard"})
+    assert table.match("btn_12") == "regex"
+    assert table.match("key_up") == "wildcard"
+    assert table.match("btn_x") is None
+
+
+def test_inline_flag_pattern_does_not_break_the_table():
+    table = StateTable({"/(?i)btn_.*/": "flag", "key_*": "wildcard"})
+    assert table.match("BTN_1") == "flag"
+    assert table.match("key_up") == "wildcard"
+
+
+def test_duplicate_group_names_do_not_break_the_table():
+    table = StateTable({"/(?P<n>a\\d)/": "a", "/(?P<n>b\\d)/": "b"})
+    assert table.match("a1") == "a"
+    assert table.match("b2") == "b"
+
+
+def test_backreferences_keep_their_meaning():
+    table = StateTable({"/x(\\d)/": "x", "/(\\w)\\1/": "double"})
+    assert table.match("x1") == "x"
+    assert table.match("aa") == "double"
+    assert table.match("ab") is None
+
+
+def test_invalid_pattern_is_ignored():
+    table = StateTable({"/(/": "broken", "105": "exact"})
+    assert table.match("105") == "exact"
+    assert len(table) == 1
+
+
+def test_literal_keys_with_pattern_characters():
+    table = StateTable({"btn[1]": "bracket", "a*": "star", "1..2": "range", "10?": "wildcard"})
+    assert table.match("btn[1]") == "bracket"
+    assert table.match("a*") == "star"
+    assert table.match("1..2") == "range"
+    assert table.match("10?") == "wildcard"
+    # Still patterns for the other states
+    assert table.match("btn1") == "bracket"
+    assert table.match("abc") == "star"
+    assert table.match("1.5") == "range"
+    assert len(table) == 4
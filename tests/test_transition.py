@@ -0,0 +1,132 @@
+"""Tests of the transition planning helpers."""
+from custom_components.state_automate.transition import merge_service_calls, plan_transition
+
+from .conftest import service_call
+
+
+def test_merge_adjacent_calls_to_distinct_entities():
+    sequence = [
+        service_call("light.turn_on", "light.a", brightness=128),
+        service_call("light.turn_on", "light.b", brightness=128),
+        service_call("light.turn_on", ["light.c", "light.d"], brightness=128),
+    ]
+    assert merge_service_calls(sequence) == [
+        service_call("light.turn_on", ["light.a", "light.b", "light.c", "light.d"], brightness=128),
+    ]
+
+
+def test_repeated_calls_to_the_same_entity_survive():
+    volume_up = {
+        "service": "remote.send_command",
+        "target": {"entity_id": "remote.living_room"},
+        "data": {"command": "volume_up"},
+    }
+    sequence = [dict(volume_up), dict(volume_up), dict(volume_up)]
+    assert merge_service_calls(sequence) == sequence
+
+
+def test_overlapping_targets_are_not_merged():
+    sequence = [
+        service_call("light.turn_on", ["light.a", "light.b"]),
+        service_call("light.turn_on", ["light.b", "light.c"]),
+    ]
+    assert merge_service_calls(sequence) == sequence
+
+
+def test_other_step_in_between_keeps_calls_apart():
+    sequence = [
+        service_call("light.turn_on", "light.a"),
+        {"delay": {"seconds": 1}},
+        service_call("light.turn_on", "light.b"),
+    ]
+    assert merge_service_calls(sequence) == sequence
+
+
+def test_different_data_is_not_merged():
+    sequence = [
+        service_call("light.turn_on", "light.a", brightness=128),
+        service_call("light.turn_on", "light.b", brightness=255),
+    ]
+    assert merge_service_calls(sequence) == sequence
+
+
+def _leave_enter(source_enter: list, source_leave: list, target_enter: list):
+    return plan_transition(source_enter, source_leave, target_enter)
+
+
+def test_enter_call_already_made_by_leave_is_dropped():
+    leave, enter = _leave_enter(
+        [],
+        [service_call("switch.turn_on", "switch.amp")],
+        [service_call("switch.turn_on", "switch.amp")],
+    )
+    assert leave == [service_call("switch.turn_on", "switch.amp")]
+    assert enter == []
+
+
+def test_enter_call_undone_later_in_leave_is_kept():
+    source_leave = [
+        service_call("switch.turn_on", "switch.amp"),
+        service_call("switch.turn_off", "switch.amp"),
+    ]
+    target_enter = [service_call("switch.turn_on", "switch.amp")]
+    assert _leave_enter([], source_leave, target_enter) == (source_leave, target_enter)
+
+
+def test_enter_call_after_another_call_on_the_entity_is_kept():
+    source_leave = [service_call("switch.turn_on", "switch.amp")]
+    target_enter = [
+        service_call("switch.turn_off", "switch.amp"),
+        service_call("switch.turn_on", "switch.amp"),
+    ]
+    assert _leave_enter([], source_leave, target_enter) == (source_leave, target_enter)
+
+
+def test_power_toggle_is_dropped_when_the_device_is_on():
+    source_enter = [service_call("media_player.turn_on", "media_player.tv")]
+    source_leave = [service_call("media_player.turn_off", "media_player.tv")]
+    target_enter = [service_call("media_player.turn_on", "media_player.tv")]
+    assert _leave_enter(source_enter, source_leave, target_enter) == ([], [])
+
+
+def test_power_toggle_is_kept_when_leave_acts_twice_on_the_device():
+    source_enter = [service_call("media_player.turn_on", "media_player.tv")]
+    source_leave = [
+        service_call("media_player.turn_off", "media_player.tv"),
+        {"delay": {"seconds": 1}},
+        service_call("media_player.turn_off", "media_player.tv"),
+    ]
+    target_enter = [service_call("media_player.turn_on", "media_player.tv")]
+    assert _leave_enter(source_enter, source_leave, target_enter) == (
+        source_leave,
+        target_enter,
+    )
+
+
+def test_calls_differing_by_their_options_are_not_the_same():
+    source_leave = [{**service_call("switch.turn_on", "switch.amp"), "continue_on_error": True}]
+    target_enter = [service_call("switch.turn_on", "switch.amp")]
+    assert _leave_enter([], source_leave, target_enter) == (source_leave, target_enter)
+
+    source_leave = [{**service_call("switch.turn_on", "switch.amp"), "enabled": False}]
+    assert _leave_enter([], source_leave, target_enter) == (source_leave, target_enter)
+
+
+def test_leave_call_after_a_condition_is_not_relied_on():
+    condition = {"condition": "state", "entity_id": "input_boolean.guest", "state": "off"}
+    source_leave = [condition, service_call("switch.turn_on", "switch.amp")]
+    target_enter = [service_call("switch.turn_on", "switch.amp")]
+    assert _leave_enter([], source_leave, target_enter) == (source_leave, target_enter)
+
+    source_enter = [{"stop": "done"}, service_call("switch.turn_on", "switch.amp")]
+    source_leave = [service_call("switch.turn_off", "switch.amp")]
+    assert _leave_enter(source_enter, source_leave, target_enter) == (source_leave, target_enter)
+
+
+def test_condition_keeps_calls_apart():
+    sequence = [
+        service_call("light.turn_on", "light.a"),
+        {"condition": "state", "entity_id": "input_boolean.guest", "state": "off"},
+        service_call("light.turn_on", "light.b"),
+    ]
+    assert merge_service_calls(sequence) == sequence